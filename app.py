@@ -1,20 +1,42 @@
-from flask import request, jsonify, session, send_file, Response
+from flask import request, jsonify, session, send_file, redirect, Response
 from flask_restful import Resource
 from sqlalchemy.exc import IntegrityError
-from config import app, db, api
-from models import User, Book, Review, ReadingList, ReadingListBook, ReadingProgress, ContentReport
+from config import app, db, api, password_hasher, response_cache, principal_cache, session_store
+from models import User, Book, Review, ReadingList, ReadingListBook, ReadingProgress, ContentReport, UploadJob, ChunkedUpload
+import json
 import logging
+import click
 import cloudinary
 import cloudinary.uploader
 from dotenv import load_dotenv
 import os
-import requests
 from io import BytesIO
-from PyPDF2 import PdfReader
-from sqlalchemy import func, text
+from sqlalchemy import func, text, and_
+from sqlalchemy.orm import selectinload
 from datetime import datetime
+from pagination import MAX_PAGE_SIZE, parse_limit, encode_cursor, decode_cursor, keyset_after
+from search import search_books
+import serializers
+from pdf_cache import PdfCache
+from http_client import PooledHttpClient
+from signed_urls import SignedUrlCache
+from ingest import submit_upload
+from passwords import PasswordHashBusy
+from progress_buffer import ProgressBuffer
+from catalog_import import BookImporter, ImportFormatError, IMPORT_FORMATS
+from metrics import (
+    registry, install_metrics, Gauge,
+    CLOUDINARY_FETCH_SECONDS, CLOUDINARY_FETCH_BYTES, PDF_PROXY_BYTES,
+)
+from uploads import (
+    UploadRequest, claim_staged_file, discard_staged_files,
+    ChunkOffsetError, ChunkChecksumError, chunked_part_dir, chunked_part_path, append_chunk, file_sha256,
+)
 from werkzeug.utils import secure_filename
 import tempfile
+import time
+import uuid
+from werkzeug.exceptions import RequestEntityTooLarge
 
 # Configure Cloudinary
 cloudinary.config( 
@@ -24,227 +46,385 @@ cloudinary.config(
     secure=True
 )
 
+def load_principal(user_id):
+    row = db.session.execute(db.select(User.id, User.username).where(User.id == user_id)).first()
+    return {"id": row.id, "username": row.username} if row else None
+
+def current_principal():
+    """The logged-in user as {"id", "username"}, from the principal cache when it can; None if logged out"""
+    user_id = session.get('user_id')
+    if user_id is None:
+        return None
+    principal = principal_cache.get(user_id, load_principal)
+    if principal is None:
+        # The user is gone, so the session is no good either
+        session.pop('user_id', None)
+    return principal
+
 # Session-based authentication check function
 def check_auth():
-    if 'user_id' not in session:
-        return False
-    return True
+    return current_principal() is not None
+
+pdf_cache = PdfCache(app.config['PDF_CACHE_DIR'], app.config['PDF_CACHE_MAX_BYTES'])
+
+class PdfFetchError(Exception):
+    """Cloudinary answered a PDF download with a non-2xx status"""
+    def __init__(self, status_code):
+        super().__init__(f"Failed to fetch PDF: {status_code}")
+        self.status_code = status_code
+
+cloudinary_http = PooledHttpClient(
+    pool_size=app.config['CLOUDINARY_POOL_SIZE'],
+    connect_timeout=app.config['CLOUDINARY_CONNECT_TIMEOUT'],
+    read_timeout=app.config['CLOUDINARY_READ_TIMEOUT'],
+    retries=app.config['CLOUDINARY_RETRIES'],
+    chunk_size=app.config['PDF_PROXY_CHUNK_SIZE'],
+)
+
+# Books whose PDF turned out to need a signed URL, so we skip the failing unsigned try
+signed_pdf_books = set()
 
-# PDF proxy endpoint with improved authentication handling
+# Signed Cloudinary download URLs, used by the signed fetch and by redirect mode
+signed_pdf_urls = SignedUrlCache(ttl=app.config['PDF_SIGNED_URL_TTL'])
+
+# Coalesces POST /reading-progress writes when READING_PROGRESS_FLUSH_MS is set
+progress_buffer = (
+    ProgressBuffer(app, app.config['READING_PROGRESS_FLUSH_MS'] / 1000)
+    if app.config['READING_PROGRESS_FLUSH_MS'] > 0 else None
+)
+
+# Request, SQL and Cloudinary metrics, served on /metrics
+install_metrics(app)
+registry.register(Gauge('password_hash_queue_depth', 'Password hashes waiting for or running on the pool',
+                        lambda: password_hasher.queue_depth))
+registry.register(Gauge('response_cache_hits_total', 'Responses served from the response cache',
+                        lambda: response_cache.hits, type='counter'))
+registry.register(Gauge('response_cache_misses_total', 'Cacheable responses that had to be built',
+                        lambda: response_cache.misses, type='counter'))
+registry.register(Gauge('response_cache_not_modified_total', 'Cached responses answered with 304',
+                        lambda: response_cache.not_modified, type='counter'))
+registry.register(Gauge('principal_cache_hits_total', 'Logged-in users resolved without a database query',
+                        lambda: principal_cache.hits, type='counter'))
+registry.register(Gauge('principal_cache_misses_total', 'Logged-in users loaded from the database',
+                        lambda: principal_cache.misses, type='counter'))
+registry.register(Gauge('reading_progress_buffered', 'Reading progress updates waiting to be flushed',
+                        lambda: progress_buffer.pending_count() if progress_buffer is not None else 0))
+
+def fetch_pdf(book, fileobj):
+    """Download a book's PDF from Cloudinary into fileobj"""
+    logging.debug(f"PDF Proxy: fetching book_id={book.id} url={book.pdf_url}")
+    started = time.perf_counter()
+    outcome = 'error'
+    response = None
+    
+    try:
+        # First try without authentication (if PDF is public)
+        if book.id not in signed_pdf_books:
+            response = cloudinary_http.get(book.pdf_url)
+            if response.status_code == 401:
+                logging.info(f"PDF Proxy: Cloudinary returned 401, retrying signed book_id={book.id}")
+                response.close()
+                response = None
+                signed_pdf_books.add(book.id)
+
+        # If unauthorized, try with authentication
+        if response is None:
+            signed_url = signed_pdf_urls.get(book.id, book.pdf_url)
+            if signed_url is None:
+                logging.warning(f"PDF Proxy: could not parse Cloudinary URL for signing book_id={book.id}")
+                raise PdfFetchError(401)
+            response = cloudinary_http.get(signed_url)
+        
+        with response:
+            if not response.ok:
+                raise PdfFetchError(response.status_code)
+            for chunk in cloudinary_http.iter_content(response):
+                fileobj.write(chunk)
+                CLOUDINARY_FETCH_BYTES.inc(len(chunk))
+        outcome = 'ok'
+    finally:
+        CLOUDINARY_FETCH_SECONDS.observe(time.perf_counter() - started, outcome=outcome)
+
+# PDF proxy endpoint, served from the local PDF cache
 @app.route('/pdf-proxy/<int:book_id>', methods=['GET'])
 def pdf_proxy(book_id):
-    """Proxy PDF content from Cloudinary through the backend"""
+    """Proxy PDF content from Cloudinary through the backend
+
+    The first request for a book downloads it into the disk cache; after that
+    Range, If-None-Match and If-Range requests are answered from the cached
+    file without touching Cloudinary.
+    """
     # Check if user is logged in using session
     if 'user_id' not in session:
-        print(f"PDF Proxy: Unauthorized access attempt for book {book_id}")
+        logging.info(f"PDF Proxy: unauthorized request book_id={book_id}")
         return jsonify({"error": "Unauthorized. Please log in."}), 401
         
     user_id = session['user_id']
-    print(f"PDF Proxy: User {user_id} requesting PDF for book {book_id}")
+    logging.debug(f"PDF Proxy: request user_id={user_id} book_id={book_id}")
     
     book = Book.query.get(book_id)
     
     if not book or not book.pdf_url:
-        print(f"PDF Proxy: Book {book_id} not found or has no PDF")
+        logging.info(f"PDF Proxy: no PDF for book_id={book_id}")
         return jsonify({"error": "PDF not found"}), 404
+
+    # Offload mode: the session check above still gates access, Cloudinary serves the bytes
+    if app.config['PDF_DELIVERY_MODE'] == 'redirect':
+        signed_url = signed_pdf_urls.get(book.id, book.pdf_url)
+        if signed_url is None:
+            logging.warning(f"PDF Proxy: could not sign Cloudinary URL book_id={book_id}")
+            return jsonify({"error": "PDF not available"}), 500
+        response = redirect(signed_url, 302)
+        response.headers['Cache-Control'] = 'private, no-store'
+        return response
         
     try:
-        # Fetch the PDF from Cloudinary
-        print(f"PDF Proxy: Fetching PDF from {book.pdf_url}")
-        
-        # Add Cloudinary authentication if needed
-        cloudinary_auth = {
-            'api_key': os.getenv('CLOUD_API_KEY'),
-            'api_secret': os.getenv('CLOUD_API_SECRET')
-        }
-        
-        # First try without authentication (if PDF is public)
-        response = requests.get(book.pdf_url, stream=True)
-        
-        # If unauthorized, try with authentication
-        if response.status_code == 401:
-            print("PDF Proxy: Cloudinary returned error 401, trying with authentication")
-            
-            # Extract the public_id from the URL
-            # Example URL: https://res.cloudinary.com/dhml0o3an/raw/upload/v1744596387/pdf_books/pdf_m0xezv.pdf
-            url_parts = book.pdf_url.split('/')
-            if len(url_parts) >= 7:
-                version_idx = -3  # Index of the version part (v1744596387)
-                folder_idx = -2   # Index of the folder part (pdf_books)
-                file_idx = -1     # Index of the file part (pdf_m0xezv.pdf)
-                
-                version = url_parts[version_idx].replace('v', '')
-                folder = url_parts[folder_idx]
-                filename = url_parts[file_idx]
-                
-                public_id = f"{folder}/{filename.split('.')[0]}"
-                
-                # Generate a signed URL
-                timestamp = int(datetime.utcnow().timestamp())
-                signature_data = f"public_id={public_id}&timestamp={timestamp}{cloudinary_auth['api_secret']}"
-                import hashlib
-                signature = hashlib.sha1(signature_data.encode()).hexdigest()
-                
-                # Construct a signed URL
-                signed_url = f"{book.pdf_url}?api_key={cloudinary_auth['api_key']}&timestamp={timestamp}&signature={signature}"
-                
-                print(f"PDF Proxy: Trying with signed URL")
-                response = requests.get(signed_url, stream=True)
-            else:
-                print("PDF Proxy: Could not parse Cloudinary URL for authentication")
-        
-        if not response.ok:
-            print(f"PDF Proxy: Cloudinary returned error {response.status_code}")
-            return jsonify({"error": f"Failed to fetch PDF: {response.status_code}"}), 500
-            
-        # Return the PDF content
-        return Response(
-            response.iter_content(chunk_size=1024),
-            content_type=response.headers.get('Content-Type', 'application/pdf'),
-            headers={
-                'Content-Disposition': f'inline; filename="{book.title}.pdf"'
-            }
-        )
+        key = PdfCache.key_for(book.id, PdfCache.version_for(book.pdf_url))
+        path = pdf_cache.get(key, lambda fileobj: fetch_pdf(book, fileobj))
+    except PdfFetchError as e:
+        logging.warning(f"PDF Proxy: Cloudinary returned status={e.status_code} book_id={book_id}")
+        return jsonify({"error": str(e)}), 500
     except Exception as e:
-        print(f"PDF Proxy: Error: {str(e)}")
+        logging.exception(f"PDF Proxy: fetch failed book_id={book_id}")
         return jsonify({"error": str(e)}), 500
 
+    # The cache key names an immutable file version, so it doubles as a strong ETag
+    response = send_file(
+        path,
+        mimetype='application/pdf',
+        download_name=f"{book.title}.pdf",
+        conditional=True,
+        etag=key,
+    )
+    response.cache_control.private = True
+    # send_file only says so on 206s; PDF.js needs it on the full response to switch to range requests
+    response.headers['Accept-Ranges'] = 'bytes'
+    if response.status_code in (200, 206):
+        PDF_PROXY_BYTES.inc(response.content_length or 0)
+    return response
+
 
 @app.route('/search')
 def search():
-    query = request.args.get('q')
-    results = Book.query.filter(
-        func.to_tsvector('english', Book.title + ' ' + Book.author + ' ' + Book.description)
-        .match(func.to_tsquery('english', query))
-    ).all()
-    return jsonify([book.to_dict() for book in results])
+    try:
+        return jsonify(search_books(request.args))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+# Stage multipart uploads on disk with a size cap instead of buffering them
+app.request_class = UploadRequest
+app.teardown_request(discard_staged_files)
+
+@app.errorhandler(413)
+def file_too_large(e=None):
+    limit_mb = app.config['UPLOAD_MAX_BYTES'] // (1024 * 1024)
+    return jsonify({"error": f"File size exceeds {limit_mb}MB limit"}), 413
 
 @app.route('/upload-pdf', methods=['POST'])
 def upload_pdf():
+    """Stage an uploaded PDF and hand it to the ingestion pool
+
+    Returns 202 with a job; poll /uploads/<job_id> for progress and the
+    resulting book.
+    """
     # Check if user is logged in
     if 'user_id' not in session:
         return jsonify({"error": "Unauthorized. Please log in."}), 401
+
+    # Reject obviously oversized bodies before reading any of them
+    if request.content_length and request.content_length > app.config['UPLOAD_MAX_BYTES'] + 64 * 1024:
+        return file_too_large()
         
     if 'pdf' not in request.files:
         return jsonify({"error": "No PDF file uploaded"}), 400
     
     file = request.files['pdf']
-    # Check file size (limit to 10MB)
-    if len(file.read()) > 10 * 1024 * 1024:  # 10MB in bytes
-        return jsonify({"error": "File size exceeds 10MB limit"}), 400
-    #reset file pointer after reading
-    file.seek(0)
-    
-    # Step 1: Upload PDF to Cloudinary with public access
+    # The upload was size-checked and spooled to UPLOAD_STAGING_DIR while it streamed in
+    path, sha256 = claim_staged_file(file)
     try:
-        print("Uploading PDF to Cloudinary with public access...")
-        upload_result = cloudinary.uploader.upload(
-            file,
-            resource_type="raw",
-            folder="pdf_books",
-            format="pdf",
-            type="upload",
-            access_mode="public",  # Make sure it's public
-            public_id=f"pdf_{int(datetime.utcnow().timestamp())}",  # Unique ID based on timestamp
-        )
-        pdf_url = upload_result["secure_url"]
-        file_size = upload_result.get("bytes", 0)
-        print(f"PDF uploaded successfully. URL: {pdf_url}")
+        job = submit_upload(session['user_id'], path, file.filename or 'upload.pdf', sha256)
     except Exception as e:
-        print(f"Cloudinary upload error: {str(e)}")
+        db.session.rollback()
+        if os.path.exists(path):
+            os.remove(path)
         return jsonify({"error": f"Upload failed: {str(e)}"}), 500
-    
 
+    # A repeat of an already ingested PDF is done straight away
+    response = jsonify(job.to_dict())
+    response.headers['Location'] = f"/uploads/{job.id}"
+    return response, 200 if job.status == 'done' else 202
 
-    
-    # Reset file pointer for metadata extraction
-    file.seek(0)
-    
-    # Step 2: Extract Metadata and content preview
-    try:
-        metadata = extract_pdf_metadata(file)
+@app.route('/uploads/<job_id>', methods=['GET'])
+def upload_status(job_id):
+    if 'user_id' not in session:
+        return jsonify({"error": "Unauthorized. Please log in."}), 401
 
-        #extract content preview for search (first few pages)
-        file.seek(0)
-        content_preview = extract_content_preview(file)
-    except Exception as e:
-        return jsonify({"error": f"Metadata extraction failed: {str(e)}"}), 500
+    job = db.session.get(UploadJob, job_id)
+    if not job or job.user_id != session['user_id']:
+        return jsonify({"error": "Upload job not found"}), 404
+    return jsonify(job.to_dict()), 200
+
+# Resumable uploads: init, then offset-addressed chunk PUTs, then complete
+def _chunked_upload_for_user(upload_id):
+    upload = db.session.get(ChunkedUpload, upload_id)
+    # Expired uploads are gone as far as clients are concerned, even before purge-chunked-uploads runs
+    if not upload or upload.user_id != session['user_id'] or upload.expired:
+        return None
+    return upload
+
+def purge_expired_chunked_uploads():
+    """Delete chunked uploads past their expiry, and staged parts that no upload owns; returns how many uploads went"""
+    now = datetime.utcnow()
+    expired = db.session.scalars(
+        db.delete(ChunkedUpload).where(ChunkedUpload.expires_at <= now).returning(ChunkedUpload.id),
+        execution_options={"synchronize_session": False},
+    ).all()
+    db.session.commit()
+    for upload_id in expired:
+        path = chunked_part_path(upload_id)
+        if os.path.exists(path):
+            os.remove(path)
+
+    # Parts left behind by a failed cancel; the age check spares a part whose row is still being created
+    live = set(db.session.scalars(db.select(ChunkedUpload.id)))
+    cutoff = time.time() - app.config['CHUNKED_UPLOAD_TTL']
+    directory = chunked_part_dir()
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        if name.endswith('.part') and name[:-len('.part')] not in live and os.path.getmtime(path) < cutoff:
+            os.remove(path)
+    return len(expired)
+
+def _chunked_upload_state(upload):
+    path = chunked_part_path(upload.id)
+    return {
+        "id": upload.id,
+        "filename": upload.filename,
+        "size": upload.total_size,
+        "received": os.path.getsize(path) if os.path.exists(path) else 0,
+        "chunk_size": app.config['CHUNKED_UPLOAD_CHUNK_BYTES'],
+    }
+
+@app.route('/upload-pdf/chunked', methods=['POST'])
+def start_chunked_upload():
+    if 'user_id' not in session:
+        return jsonify({"error": "Unauthorized. Please log in."}), 401
+
+    data = request.get_json() or {}
+    size = data.get('size')
+    if isinstance(size, int) and size > app.config['CHUNKED_UPLOAD_MAX_BYTES']:
+        return file_too_large()
 
-    # Step 3: Save to Database
     try:
-        book = Book(
-            title=metadata["title"],
-            author=metadata["author"],
-            page_count=metadata["page_count"],
-            pdf_url=pdf_url,
-            is_pdf=True,
-            file_size=file_size,
-            content_preview=content_preview,
-            upload_date=datetime.utcnow(),
-            # Optional: Set other fields (genre, description, etc.)
+        upload = ChunkedUpload(
+            id=uuid.uuid4().hex,
+            user_id=session['user_id'],
+            filename=data.get('filename'),
+            total_size=size,
+            sha256=data.get('sha256'),
         )
-        db.session.add(book)
+        upload.extend(app.config['CHUNKED_UPLOAD_TTL'])
+        db.session.add(upload)
         db.session.commit()
-        
-        # Update search vector
-        Book.update_search_vector()
-        
-        return jsonify(book.to_dict()), 201
-    except Exception as e:
+    except ValueError as e:
         db.session.rollback()
-        return jsonify({"error": f"Database error: {str(e)}"}), 500
+        return jsonify({"error": str(e)}), 400
 
-def extract_pdf_metadata(pdf_file):
-    pdf = PdfReader(pdf_file)
-    
-    # Extract title and author with fallbacks
-    title = pdf.metadata.get("/Title", "")
-    if not title:
-        # Use filename as fallback
-        title = pdf_file.filename.replace(".pdf", "")
-    
-    author = pdf.metadata.get("/Author", "Unknown")
-    
-    return {
-        "title": title,
-        "author": author,
-        "page_count": len(pdf.pages)
-    }
+    open(chunked_part_path(upload.id), 'wb').close()
+    return jsonify(_chunked_upload_state(upload)), 201
 
-def extract_content_preview(pdf_file, max_pages=5, max_chars=10000):
-    """Extract text from the first few pages for search indexing"""
-    pdf = PdfReader(pdf_file)
-    content = []
-    
-    # Extract text from first few pages
-    for i in range(min(max_pages, len(pdf.pages))):
-        page = pdf.pages[i]
-        content.append(page.extract_text())
-        
-        # Check if we've extracted enough text
-        if sum(len(text) for text in content) >= max_chars:
-            break
-    
-    return " ".join(content)[:max_chars]
+@app.route('/upload-pdf/chunked/<upload_id>', methods=['GET', 'PUT', 'DELETE'])
+def chunked_upload(upload_id):
+    if 'user_id' not in session:
+        return jsonify({"error": "Unauthorized. Please log in."}), 401
+
+    upload = _chunked_upload_for_user(upload_id)
+    if not upload:
+        return jsonify({"error": "Upload not found"}), 404
+    path = chunked_part_path(upload.id)
+
+    # GET: how much has arrived, so a client can resume after a dropped connection
+    if request.method == 'GET':
+        return jsonify(_chunked_upload_state(upload)), 200
+
+    if request.method == 'DELETE':
+        if os.path.exists(path):
+            os.remove(path)
+        db.session.delete(upload)
+        db.session.commit()
+        return jsonify({"message": "Upload cancelled"}), 200
+
+    try:
+        offset = int(request.args.get('offset', ''))
+    except ValueError:
+        return jsonify({"error": "offset is required"}), 400
+
+    try:
+        received = append_chunk(
+            path,
+            offset,
+            request.stream,
+            max_bytes=min(app.config['CHUNKED_UPLOAD_CHUNK_BYTES'], upload.total_size - offset),
+            expected_sha256=request.headers.get('X-Chunk-SHA256'),
+        )
+    except FileNotFoundError:
+        return jsonify({"error": "Upload not found"}), 404
+    except ChunkOffsetError as e:
+        return jsonify({"error": str(e), "received": e.received}), 409
+    except ChunkChecksumError as e:
+        return jsonify({"error": str(e), "received": offset}), 400
+    except RequestEntityTooLarge:
+        return jsonify({"error": "Chunk is larger than allowed", "received": offset}), 413
+
+    upload.extend(app.config['CHUNKED_UPLOAD_TTL'])
+    db.session.commit()
+    state = _chunked_upload_state(upload)
+    state["received"] = received
+    return jsonify(state), 200
+
+@app.route('/upload-pdf/chunked/<upload_id>/complete', methods=['POST'])
+def complete_chunked_upload(upload_id):
+    """Check the assembled file and queue it for ingestion like /upload-pdf"""
+    if 'user_id' not in session:
+        return jsonify({"error": "Unauthorized. Please log in."}), 401
 
-# Replace both search_pdfs functions with this one
+    upload = _chunked_upload_for_user(upload_id)
+    if not upload:
+        return jsonify({"error": "Upload not found"}), 404
+    path = chunked_part_path(upload.id)
+
+    received = os.path.getsize(path) if os.path.exists(path) else 0
+    if received != upload.total_size:
+        return jsonify({"error": "Upload is incomplete", "received": received, "size": upload.total_size}), 409
+    # Chunks arrive in separate requests, so the whole-file hash is taken once here
+    sha256 = file_sha256(path)
+    if upload.sha256 and sha256 != upload.sha256:
+        return jsonify({"error": "File checksum does not match"}), 400
+
+    # Move the file out of the chunked area so a repeat complete can't queue it twice
+    staged_fd, staged_path = tempfile.mkstemp(dir=app.config['UPLOAD_STAGING_DIR'], suffix='.pdf')
+    os.close(staged_fd)
+    os.replace(path, staged_path)
+    try:
+        db.session.delete(upload)
+        job = submit_upload(session['user_id'], staged_path, upload.filename, sha256)
+    except Exception as e:
+        db.session.rollback()
+        if os.path.exists(staged_path):
+            os.remove(staged_path)
+        return jsonify({"error": f"Upload failed: {str(e)}"}), 500
+
+    response = jsonify(job.to_dict())
+    response.headers['Location'] = f"/uploads/{job.id}"
+    return response, 200 if job.status == 'done' else 202
+
+# Same engine as /search; search_vector already covers content_preview
 @app.route('/search-pdfs')
 def search_pdfs():
-    query = request.args.get('q')
-    if not query:
-        return jsonify([])
-    
-    # Use PostgreSQL's full-text search capabilities
-    results = Book.query.filter(
-        func.to_tsvector('english', 
-            Book.title + ' ' + 
-            Book.author + ' ' + 
-            func.coalesce(Book.description, '') + ' ' + 
-            func.coalesce(Book.content_preview, '')
-        ).match(func.to_tsquery('english', query))
-    ).all()
-    
-    return jsonify([book.to_dict() for book in results])
+    try:
+        return jsonify(search_books(request.args))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
 # Endpoint to track reading progress
 @app.route('/reading-progress', methods=['POST'])
@@ -260,27 +440,24 @@ def update_reading_progress():
         return jsonify({"error": "Missing required fields"}), 400
     
     try:
-        # Check if progress record exists
-        progress = ReadingProgress.query.filter_by(
-            user_id=user_id,
-            book_id=data['book_id']
-        ).first()
-        
-        if progress:
-            progress.current_page = data['page']
-            progress.percentage = data['percentage']
-            progress.last_read = datetime.utcnow()
+        book_id = int(data['book_id'])
+        current_page = ReadingProgress.check_current_page(data['page'])
+        percentage = ReadingProgress.check_percentage(data['percentage'])
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        if progress_buffer is not None:
+            progress_buffer.add(user_id, book_id, current_page, percentage, datetime.utcnow())
         else:
-            progress = ReadingProgress(
-                user_id=user_id,
-                book_id=data['book_id'],
-                current_page=data['page'],
-                percentage=data['percentage'],
-                last_read=datetime.utcnow()
-            )
-            db.session.add(progress)
-        
-        db.session.commit()
+            ReadingProgress.upsert([{
+                "user_id": user_id,
+                "book_id": book_id,
+                "current_page": current_page,
+                "percentage": percentage,
+                "last_read": datetime.utcnow(),
+            }])
+            db.session.commit()
         return jsonify({"success": True}), 200
     except Exception as e:
         db.session.rollback()
@@ -325,6 +502,15 @@ def get_reading_progress(book_id):
     user_id = session['user_id']
     
     try:
+        # Updates still waiting in the buffer are newer than the table
+        buffered = progress_buffer.get(user_id, book_id) if progress_buffer is not None else None
+        if buffered:
+            return jsonify({
+                "current_page": buffered["current_page"],
+                "percentage": buffered["percentage"],
+                "last_read": buffered["last_read"].isoformat()
+            }), 200
+
         progress = ReadingProgress.query.filter_by(
             user_id=user_id,
             book_id=book_id
@@ -345,6 +531,85 @@ def get_reading_progress(book_id):
     except Exception as e:
         return jsonify({"error": f"Failed to get reading progress: {str(e)}"}), 500
 
+PROGRESS_COLUMNS = (ReadingProgress.current_page, ReadingProgress.percentage, ReadingProgress.last_read)
+
+def progress_entry(book_row, progress):
+    """One shelf item; progress is a row or buffered dict with the progress columns, or None"""
+    if progress is None:
+        current_page, percentage, last_read = 1, 0, None
+    elif isinstance(progress, dict):
+        current_page, percentage, last_read = progress["current_page"], progress["percentage"], progress["last_read"]
+    else:
+        current_page, percentage, last_read = progress.current_page, progress.percentage, progress.last_read
+    return {
+        "book_id": book_row.id,
+        "current_page": current_page,
+        "percentage": percentage,
+        "last_read": last_read.isoformat() if last_read else None,
+        "book": Book.row_to_dict(book_row, Book.api_fields),
+    }
+
+# Batch lookup for "continue reading" shelves
+@app.route('/reading-progress', methods=['GET'])
+def list_reading_progress():
+    # Check if user is logged in
+    if 'user_id' not in session:
+        return jsonify({"error": "Unauthorized. Please log in."}), 401
+    
+    user_id = session['user_id']
+    buffered = progress_buffer.for_user(user_id) if progress_buffer is not None else {}
+    book_columns = [getattr(Book, c) for c in Book.api_fields.values()]
+
+    try:
+        if request.args.get('book_ids'):
+            try:
+                book_ids = list(dict.fromkeys(int(i) for i in request.args['book_ids'].split(',') if i.strip()))
+            except ValueError:
+                return jsonify({"error": "book_ids must be a comma-separated list of integers."}), 400
+            if len(book_ids) > MAX_PAGE_SIZE:
+                return jsonify({"error": f"At most {MAX_PAGE_SIZE} book_ids per request."}), 400
+
+            # Books the user hasn't opened yet come back with default progress
+            rows = db.session.query(*book_columns, *PROGRESS_COLUMNS).outerjoin(
+                ReadingProgress,
+                and_(ReadingProgress.book_id == Book.id, ReadingProgress.user_id == user_id),
+            ).filter(Book.id.in_(book_ids)).all()
+            by_id = {row.id: row for row in rows}
+            items = []
+            for book_id in book_ids:
+                row = by_id.get(book_id)
+                if row is None:
+                    continue
+                progress = buffered.get(book_id) or (row if row.current_page is not None else None)
+                items.append(progress_entry(row, progress))
+            return jsonify({"progress": items}), 200
+
+        limit = parse_limit(request.args.get('recent'))
+        # Read enough rows that buffered updates can't push the shelf below limit
+        rows = db.session.query(*book_columns, *PROGRESS_COLUMNS).join(
+            ReadingProgress, ReadingProgress.book_id == Book.id,
+        ).filter(ReadingProgress.user_id == user_id).order_by(
+            ReadingProgress.last_read.desc()
+        ).limit(limit + len(buffered)).all()
+
+        entries = {row.id: (row, buffered.get(row.id) or row) for row in rows}
+        missing = [book_id for book_id in buffered if book_id not in entries]
+        if missing:
+            for row in db.session.query(*book_columns).filter(Book.id.in_(missing)):
+                entries[row.id] = (row, buffered[row.id])
+
+        def last_read(entry):
+            progress = entry[1]
+            value = progress["last_read"] if isinstance(progress, dict) else progress.last_read
+            return value or datetime.min
+
+        shelf = sorted(entries.values(), key=last_read, reverse=True)[:limit]
+        return jsonify({"progress": [progress_entry(row, progress) for row, progress in shelf]}), 200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": f"Failed to get reading progress: {str(e)}"}), 500
+
 # Add an endpoint to get bookmarks for a book
 @app.route('/bookmarks/<int:book_id>', methods=['GET', 'POST', 'DELETE'])
 def manage_bookmarks(book_id):
@@ -366,9 +631,18 @@ def manage_bookmarks(book_id):
     # Other methods would be implemented similarly
     return jsonify({"message": "Endpoint not fully implemented yet"}), 501
 
+@app.route('/metrics')
+def metrics_endpoint():
+    return Response(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
 @app.route('/health')
 def health_check():
-    return jsonify({"status":"ok"}),200
+    return jsonify({
+        "status":"ok",
+        "password_hash_queue": password_hasher.queue_depth,
+        "response_cache": response_cache.stats(),
+        "principal_cache": principal_cache.stats(),
+    }),200
 
 @app.route('/init-db')
 def init_db():
@@ -378,27 +652,129 @@ def init_db():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+def warn_cached_responses_stale():
+    # A CLI process has its own in-memory response cache, so its invalidations never reach the workers
+    if response_cache.enabled and not response_cache.shared:
+        click.echo(
+            f"Note: running workers may serve cached responses from before this change for up to "
+            f"RESPONSE_CACHE_TTL ({response_cache.ttl}s). Set RESPONSE_CACHE_URL to share invalidations, "
+            f"or restart the workers to drop them now.",
+            err=True,
+        )
+
+@app.cli.command('backfill-search-vectors')
+def backfill_search_vectors_command():
+    """Fill search_vector for books written before it was maintained per row"""
+    missing = db.session.scalar(db.select(func.count(Book.id)).where(Book.search_vector.is_(None)))
+    Book.update_search_vector()
+    click.echo(f"Filled search vectors for {missing} book(s).")
+
+@app.cli.command('reconcile-ratings')
+def reconcile_ratings_command():
+    """Rebuild review_count, rating_sum and avg_rating on books from their reviews"""
+    fixed = Book.reconcile_ratings()
+    response_cache.clear()
+    click.echo(f"Reconciled rating aggregates for {fixed} book(s).")
+    if fixed:
+        warn_cached_responses_stale()
+
+@app.cli.command('purge-chunked-uploads')
+def purge_chunked_uploads_command():
+    """Delete resumable uploads that have had no chunk for CHUNKED_UPLOAD_TTL seconds, with their staged files"""
+    purged = purge_expired_chunked_uploads()
+    click.echo(f"Purged {purged} expired upload(s).")
+
+@app.cli.command('revoke-sessions')
+@click.argument('username')
+def revoke_sessions_command(username):
+    """Log a user out everywhere by deleting their server-side sessions"""
+    if session_store is None:
+        raise click.ClickException("Sessions live in signed cookies; set SESSION_STORE_URL to be able to revoke them.")
+    user = User.query.filter_by(username=username).first()
+    if user is None:
+        raise click.ClickException(f"No user named {username}.")
+    revoked = session_store.delete_user(user.id)
+    principal_cache.invalidate(user.id)
+    click.echo(f"Revoked {revoked} session(s) for {username}.")
+
+@app.cli.command('dedupe-reviews')
+def dedupe_reviews_command():
+    """Delete all but the newest review per user and book, ahead of the uq_reviews_user_book migration"""
+    removed = Review.delete_duplicates()
+    if removed:
+        Book.reconcile_ratings()
+        response_cache.clear()
+    click.echo(f"Deleted {removed} duplicate review(s).")
+    if removed:
+        warn_cached_responses_stale()
+
+@app.cli.command('dedupe-reading-progress')
+def dedupe_reading_progress_command():
+    """Delete all but the latest progress row per user and book, ahead of the uq_reading_progress_user_book migration"""
+    removed = ReadingProgress.delete_duplicates()
+    click.echo(f"Deleted {removed} duplicate reading progress row(s).")
+
+@app.cli.command('import-books')
+@click.argument('catalog', type=click.File('rb'))
+@click.option('--format', 'fmt', type=click.Choice(IMPORT_FORMATS), help="Defaults to the file's extension.")
+@click.option('--batch-size', type=int, default=None, help="Rows per write (BOOK_IMPORT_BATCH_SIZE).")
+@click.option('--errors', 'errors_file', type=click.File('w'), help="Write rejected rows here as JSON lines.")
+def import_books_command(catalog, fmt, batch_size, errors_file):
+    """Bulk import books from a CSV or JSONL catalog (- reads stdin)"""
+    fmt = fmt or ('jsonl' if catalog.name.endswith(('.jsonl', '.ndjson')) else 'csv')
+
+    def report(line, errors):
+        if errors_file:
+            errors_file.write(json.dumps({"line": line, "errors": errors}) + "\n")
+        else:
+            click.echo(f"line {line}: {'; '.join(errors)}", err=True)
+
+    importer = BookImporter(batch_size or app.config['BOOK_IMPORT_BATCH_SIZE'], on_error=report)
+    try:
+        result = importer.run(catalog, fmt)
+    except ImportFormatError as e:
+        raise click.ClickException(str(e))
+    click.echo(f"Imported {result['imported']} book(s), rejected {result['failed']}.")
+    if result['imported']:
+        warn_cached_responses_stale()
+
+@app.cli.command('delete-books')
+@click.option('--id', 'ids', type=int, multiple=True, help="Book id to delete; repeat for more.")
+@click.option('--report-status', type=click.Choice(ContentReport.STATUSES), help="Books with a content report in this status.")
+@click.option('--genre', help="Books in this genre.")
+@click.option('--author', help="Books by this author.")
+def delete_books_command(ids, report_status, genre, author):
+    """Delete books matching every given option, with their reviews, list entries, progress and reports"""
+    filters = {'report_status': report_status, 'genre': genre, 'author': author}
+    try:
+        criteria = book_delete_criteria(list(ids) if ids else None, {k: v for k, v in filters.items() if v is not None})
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    deleted = Book.delete_where(*criteria)
+    invalidate_deleted_books(deleted)
+    click.echo(f"Deleted {len(deleted)} book(s).")
+    if deleted:
+        warn_cached_responses_stale()
+
 @app.before_request
 def check_protected_endpoints():
     protected_endpoints =['/books','/reading-lists']
-    logging.debug(f"Session Data: {session.get('user_id')}")
+    logging.debug(f"session user_id={session.get('user_id')} path={request.path}")
 
     #allow preflight requests to pass
     if request.method == 'OPTIONS':
         return jsonify({"message":"Ok"}), 200
 
-    if any(request.path.startswith(endpoint) for endpoint in protected_endpoints) and not session.get('user_id'):
+    if any(request.path.startswith(endpoint) for endpoint in protected_endpoints) and not check_auth():
         return jsonify({"error": "unauthorized. please log in"}), 401
 
 @app.route('/check-auth', methods=['GET'])
 def check_auth_route():
-    print("Session data:", session)  # Debugging: Print session data
-    if 'user_id' in session:
-        user = User.query.get(session['user_id'])
-        if user:
-            print(f"User authenticated: {user.id}")  # Debugging
-            return jsonify({"authenticated": True, "user": {"id": user.id, "username": user.username}})
-    print("User not authenticated")  # Debugging
+    principal = current_principal()
+    if principal:
+        logging.debug(f"check-auth: authenticated user_id={principal['id']}")
+        return jsonify({"authenticated": True, "user": principal})
+    logging.debug("check-auth: not authenticated")
     return jsonify({"authenticated": False}), 401
 
 class HomeResource(Resource):
@@ -406,6 +782,9 @@ class HomeResource(Resource):
         return jsonify({"message": "Welcome to the Book App API!"})
 api.add_resource(HomeResource, "/")
 
+# Returned when the password hashing pool is saturated
+PASSWORD_BUSY_RESPONSE = ({"error": "Server is busy, please try again shortly."}, 503, {"Retry-After": "1"})
+
 class SignupResource(Resource):
     def post(self):
         data = request.get_json()
@@ -424,6 +803,9 @@ class SignupResource(Resource):
         except IntegrityError:
             db.session.rollback()
             return {"error": "Username already taken, try another one."}, 400
+        except PasswordHashBusy:
+            db.session.rollback()
+            return PASSWORD_BUSY_RESPONSE
 
 api.add_resource(SignupResource, '/signup')
 
@@ -434,9 +816,18 @@ class LoginResource(Resource):
         password = data.get('password')
 
         user = User.query.filter_by(username=username).first()
-        if user and user.check_password(password):
+        try:
+            authenticated = user is not None and user.check_password(password)
+            # Upgrade hashes made with an older work factor while we have the plain password
+            if authenticated and user.password_needs_rehash():
+                user.set_password(password)
+                db.session.commit()
+        except PasswordHashBusy:
+            db.session.rollback()
+            return PASSWORD_BUSY_RESPONSE
+        if authenticated:
             session['user_id'] = user.id
-            print(f"Session set for user: {user.id}")  # Debugging
+            logging.debug(f"login: session set user_id={user.id}")
             return {"message": "Login successful", "user": {"id": user.id, "username": user.username}}, 200
         return {"error": "Invalid credentials"}, 401
 
@@ -444,7 +835,9 @@ class LogoutResource(Resource):
     def post(self):
         if 'user_id' not in session:
             return{"error":"Not logged in"}, 400
-        session.pop('user_id', None)
+        principal_cache.invalidate(session['user_id'])
+        # Emptying the session also deletes it from the server-side store, when there is one
+        session.clear()
         return {"message":"Logged out successfully"}, 200
 
 api.add_resource(LoginResource, '/login')
@@ -454,15 +847,41 @@ api.add_resource(LogoutResource, '/logout')
 def handle_404_error(e):
     return jsonify({"error":"The requested endpoint was not found, check the url for any typos"}),404
 
+# Everything User.to_dict() walks, loaded with one SELECT ... IN per relationship
+USER_GRAPH = (
+    selectinload(User.reviews)
+        .selectinload(Review.book)
+        .selectinload(Book.reading_list_books),
+    selectinload(User.reading_lists)
+        .selectinload(ReadingList.books)
+        .selectinload(ReadingListBook.book)
+        .selectinload(Book.reviews),
+)
+
 class UserInfo(Resource):
     def get(self, id=None):
         if id:
-            user = User.query.get(id)
+            user = User.query.options(*USER_GRAPH).filter_by(id=id).first()
             if user:
                 return user.to_dict()
             return {"error": "User not found"}, 404
-        users = User.query.all()
-        return [user.to_dict() for user in users]
+
+        # Keyset page of users ordered by id
+        try:
+            limit = parse_limit(request.args.get('limit'))
+            query = User.query.options(*USER_GRAPH).order_by(User.id)
+            if request.args.get('cursor'):
+                (last_id,) = decode_cursor(request.args['cursor'], int)
+                query = query.filter(User.id > last_id)
+        except ValueError as e:
+            return {"error": str(e)}, 400
+
+        users = query.limit(limit + 1).all()
+        next_cursor = None
+        if len(users) > limit:
+            users = users[:limit]
+            next_cursor = encode_cursor(users[-1].id)
+        return {"users": [user.to_dict() for user in users], "next_cursor": next_cursor}
 
     def post(self):
         data = request.get_json()
@@ -480,17 +899,142 @@ class UserInfo(Resource):
         except IntegrityError:
             db.session.rollback()
             return {"error": "Username must be unique."}, 400
+        except PasswordHashBusy:
+            db.session.rollback()
+            return PASSWORD_BUSY_RESPONSE
 api.add_resource(UserInfo, '/users', '/users/<int:id>')
 
+# Sort name -> (column, cursor type); every sort but id is newest/highest first with NULLs last
+BOOK_SORT_KEYS = {
+    'id': (Book.id, int),
+    'upload_date': (Book.upload_date, datetime),
+    'rating': (Book.avg_rating, float),
+}
+
+def list_books(args):
+    """Return one keyset page of the catalog plus the cursor for the next one"""
+    sort = args.get('sort', 'id')
+    if sort not in BOOK_SORT_KEYS:
+        raise ValueError(f"Sort must be one of: {', '.join(BOOK_SORT_KEYS)}")
+    limit = parse_limit(args.get('limit'))
+    sort_column, cursor_type = BOOK_SORT_KEYS[sort]
+
+    fields = list(Book.api_fields)
+    if args.get('fields'):
+        fields = [f.strip() for f in args['fields'].split(',') if f.strip()]
+        unknown = [f for f in fields if f not in Book.api_fields]
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+        if 'id' not in fields:
+            fields.insert(0, 'id')
+
+    # Only load the requested columns, plus whatever the cursor needs
+    columns = {Book.api_fields[f] for f in fields} | {'id', sort_column.key}
+    query = db.session.query(*[getattr(Book, c) for c in sorted(columns)])
+
+    if args.get('min_rating'):
+        try:
+            min_rating = float(args['min_rating'])
+        except ValueError:
+            raise ValueError("min_rating must be a number.")
+        query = query.filter(Book.avg_rating >= min_rating)
+
+    cursor = args.get('cursor')
+    if sort == 'id':
+        if cursor:
+            (last_id,) = decode_cursor(cursor, int)
+            query = query.filter(Book.id > last_id)
+        query = query.order_by(Book.id)
+    else:
+        # Newest (or best rated) first, books without a value last
+        if cursor:
+            last_value, last_id = decode_cursor(cursor, cursor_type, int)
+            query = query.filter(keyset_after(sort_column, Book.id, last_value, last_id))
+        query = query.order_by(sort_column.desc().nulls_last(), Book.id.desc())
+
+    # Fetch one extra row to find out whether there is a next page
+    rows = query.limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        if sort == 'id':
+            next_cursor = encode_cursor(last.id)
+        else:
+            next_cursor = encode_cursor(getattr(last, sort_column.key), last.id)
+
+    return {
+        "books": [Book.row_to_dict(row, fields) for row in rows],
+        "next_cursor": next_cursor,
+    }
+
+# Bulk catalog import; the request body is the CSV or JSONL file itself
+IMPORT_CONTENT_TYPES = {
+    'text/csv': 'csv',
+    'application/x-ndjson': 'jsonl',
+    'application/jsonl': 'jsonl',
+}
+
+@app.route('/books/import', methods=['POST'])
+def import_books():
+    if 'user_id' not in session:
+        return jsonify({"error": "Unauthorized. Please log in."}), 401
+
+    fmt = request.args.get('format') or IMPORT_CONTENT_TYPES.get(request.mimetype)
+    if fmt not in IMPORT_FORMATS:
+        return jsonify({"error": f"Send text/csv or application/x-ndjson, or pass ?format= one of: {', '.join(IMPORT_FORMATS)}"}), 400
+
+    max_errors = app.config['BOOK_IMPORT_MAX_REPORTED_ERRORS']
+    errors = []
+    def report(line, row_errors):
+        if len(errors) < max_errors:
+            errors.append({"line": line, "errors": row_errors})
+
+    importer = BookImporter(app.config['BOOK_IMPORT_BATCH_SIZE'], on_error=report)
+    try:
+        result = importer.run(request.stream, fmt)
+    except ImportFormatError as e:
+        return jsonify({"error": str(e), **importer_summary(importer)}), 400
+    except Exception as e:
+        db.session.rollback()
+        logging.exception("Bulk book import failed")
+        return jsonify({"error": f"Import failed: {str(e)}", **importer_summary(importer)}), 500
+
+    return jsonify({**result, "errors": errors, "errors_truncated": result["failed"] > len(errors)}), 200
+
+def importer_summary(importer):
+    # Batches already committed stay imported when a later one fails
+    return {"imported": importer.imported, "failed": importer.failed}
+
+# Cache tags: "books"/"reviews" cover every row of that kind, "book:<id>"/"review:<id>" one row.
+# Reviews embed their book and its reading list entries, so they also depend on "books" and "reading_lists".
+def book_cache_tags(kwargs):
+    return (f"book:{kwargs['id']}",) if kwargs.get('id') else ("books",)
+
+def review_cache_tags(kwargs):
+    own = f"review:{kwargs['id']}" if kwargs.get('id') else "reviews"
+    return (own, "books", "reading_lists")
+
+# A book's feed names each review's author; a user's feed embeds each review's book
+def book_reviews_cache_tags(kwargs):
+    return ("reviews",)
+
+def user_reviews_cache_tags(kwargs):
+    return ("reviews", "books")
+
 class BookResource(Resource):
+    method_decorators = {'get': [response_cache.cached(api.make_response, book_cache_tags)]}
+
     def get(self, id=None):
         if id:
             book = Book.query.get(id)
             if book:
                 return book.to_dict()
             return {"error": "Book not found"}, 404
-        books = Book.query.all()
-        return [book.to_dict() for book in books]
+        try:
+            return list_books(request.args)
+        except ValueError as e:
+            return {"error": str(e)}, 400
 
     def post(self):
         try:
@@ -509,6 +1053,7 @@ class BookResource(Resource):
             )
             db.session.add(new_book)
             db.session.commit()
+            response_cache.invalidate("books")
             return new_book.to_dict(), 201
         except IntegrityError as e:
             db.session.rollback()
@@ -519,30 +1064,125 @@ class BookResource(Resource):
             logging.error(f"Unexpected error: {str(e)}")
             return {"error": "An unexpected error occurred. Please try again."}, 500
     def delete(self,id):
-        book = Book.query.get(id)
-        if not book:
-            return {"error":"Book not found"}
         try:
-            ReadingListBook.query.filter_by(book_id=id).delete()
-            Review.query.filter_by(book_id=id).delete()
-            db.session.delete(book)
-            db.session.commit()
+            # Reviews, list entries, reading progress and reports go with the book via ON DELETE CASCADE
+            if not Book.delete_where(Book.id == id):
+                return {"error":"Book not found"}, 404
+            invalidate_deleted_books([id])
             return {"message":"Book deleted succesfully"},200
         except Exception as e:
             db.session.rollback()
             return {"error":f"Failed to delete book: {str(e)}"},500
 api.add_resource(BookResource, '/books', '/books/<int:id>')
 
+# Filters a bulk delete can select books by, beyond a list of ids
+BULK_DELETE_FILTERS = ('report_status', 'genre', 'author')
+
+def book_delete_criteria(ids=None, filters=None):
+    """WHERE clauses for Book.delete_where from a list of ids and/or BULK_DELETE_FILTERS"""
+    criteria = []
+    if ids is not None:
+        if not isinstance(ids, list) or not all(isinstance(i, int) and not isinstance(i, bool) for i in ids):
+            raise ValueError("ids must be a list of integers.")
+        criteria.append(Book.id.in_(ids))
+    filters = filters or {}
+    if not isinstance(filters, dict):
+        raise ValueError("filter must be an object.")
+    unknown = set(filters) - set(BULK_DELETE_FILTERS)
+    if unknown:
+        raise ValueError(f"Unknown filter(s): {', '.join(sorted(unknown))}. Use: {', '.join(BULK_DELETE_FILTERS)}")
+    if 'report_status' in filters:
+        if filters['report_status'] not in ContentReport.STATUSES:
+            raise ValueError(f"report_status must be one of: {', '.join(ContentReport.STATUSES)}")
+        reported = db.select(ContentReport.book_id).where(ContentReport.status == filters['report_status'])
+        criteria.append(Book.id.in_(reported))
+    for field in ('genre', 'author'):
+        if field in filters:
+            criteria.append(getattr(Book, field) == filters[field])
+    # Never let an empty request mean "every book"
+    if not criteria:
+        raise ValueError("Give ids or at least one filter.")
+    return criteria
+
+def invalidate_deleted_books(ids):
+    # Review and reading list responses embed books, so they go stale along with them
+    if ids:
+        response_cache.invalidate("books", "reviews", "reading_lists", *(f"book:{book_id}" for book_id in ids))
+
+@app.route('/books/bulk-delete', methods=['POST'])
+def bulk_delete_books():
+    """Delete many books, and everything that depends on them, in one statement"""
+    data = request.get_json(silent=True) or {}
+    try:
+        criteria = book_delete_criteria(data.get('ids'), data.get('filter'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    try:
+        deleted = Book.delete_where(*criteria)
+    except Exception as e:
+        db.session.rollback()
+        logging.exception("Bulk book delete failed")
+        return jsonify({"error": f"Failed to delete books: {str(e)}"}), 500
+    invalidate_deleted_books(deleted)
+    return jsonify({"deleted": len(deleted), "ids": sorted(deleted)}), 200
+
 # Review Resource
+def review_page(query, args, serialize):
+    """Return one keyset page of reviews, newest first, plus the cursor for the next one"""
+    limit = parse_limit(args.get('limit'))
+    if args.get('cursor'):
+        last_created_at, last_id = decode_cursor(args['cursor'], datetime, int)
+        query = query.filter(keyset_after(Review.created_at, Review.id, last_created_at, last_id))
+    query = query.order_by(Review.created_at.desc().nulls_last(), Review.id.desc())
+
+    # Fetch one extra row to find out whether there is a next page
+    reviews = query.limit(limit + 1).all()
+    next_cursor = None
+    if len(reviews) > limit:
+        reviews = reviews[:limit]
+        next_cursor = encode_cursor(reviews[-1].created_at, reviews[-1].id)
+
+    return {
+        "reviews": [serialize(review) for review in reviews],
+        "next_cursor": next_cursor,
+    }
+
+@app.route('/books/<int:book_id>/reviews', methods=['GET'])
+@response_cache.cached(api.make_response, book_reviews_cache_tags)
+def book_reviews(book_id):
+    if db.session.get(Book, book_id) is None:
+        return {"error": "Book not found"}, 404
+    query = Review.query.filter_by(book_id=book_id).options(selectinload(Review.user))
+    try:
+        return review_page(query, request.args, serializers.book_review), 200
+    except ValueError as e:
+        return {"error": str(e)}, 400
+
+@app.route('/users/<int:user_id>/reviews', methods=['GET'])
+@response_cache.cached(api.make_response, user_reviews_cache_tags)
+def user_reviews(user_id):
+    if db.session.get(User, user_id) is None:
+        return {"error": "User not found"}, 404
+    query = Review.query.filter_by(user_id=user_id).options(selectinload(Review.book))
+    try:
+        return review_page(query, request.args, serializers.user_review), 200
+    except ValueError as e:
+        return {"error": str(e)}, 400
+
 class ReviewResource(Resource):
+    method_decorators = {'get': [response_cache.cached(api.make_response, review_cache_tags)]}
+
     def get(self, id=None):
         if id:
             review = Review.query.get(id)
             if review:
                 return review.to_dict()
             return {"error": "Review not found"}, 404
-        reviews = Review.query.all()
-        return [review.to_dict() for review in reviews]
+        query = Review.query.options(selectinload(Review.book).selectinload(Book.reading_list_books))
+        try:
+            return review_page(query, request.args, serializers.review)
+        except ValueError as e:
+            return {"error": str(e)}, 400
 
      # POST: Create a new review
     def post(self):
@@ -555,12 +1195,8 @@ class ReviewResource(Resource):
 
         if not user_id or not book_id or not review_text or not rating:
             return {'error': 'User ID, Book ID, review text, and rating are required'}, 422
-        # Check if the user has already reviewed this book
-        existing_review = Review.query.filter_by(user_id=user_id, book_id=book_id).first()
-        if existing_review:
-            return {"error": "You have already reviewed this book."}, 400
-
 
+        # uq_reviews_user_book turns away a second review of the same book, even from a concurrent request
         try:
             new_review = Review(
                 user_id=user_id,
@@ -569,10 +1205,15 @@ class ReviewResource(Resource):
                 rating=rating
             )
             db.session.add(new_review)
+            db.session.flush()
+            Book.adjust_ratings(new_review.book_id, 1, new_review.rating)
             db.session.commit()
+            response_cache.invalidate("reviews", "books", f"book:{new_review.book_id}")
             return new_review.to_dict(), 201
         except IntegrityError:
             db.session.rollback()
+            if Review.query.filter_by(user_id=user_id, book_id=book_id).first():
+                return {"error": "You have already reviewed this book."}, 400
             return {"error": "Failed to create review. Please check the data."}, 400
         
     def put(self, id):
@@ -582,11 +1223,15 @@ class ReviewResource(Resource):
         if not review:
             return {"error": "Review not found"}, 404
 
+        old_rating = review.rating
         review.review_text = data.get('review_text', review.review_text)  
         review.rating = data.get('rating', review.rating)  
 
         try:
+            if review.rating != old_rating:
+                Book.adjust_ratings(review.book_id, 0, review.rating - old_rating)
             db.session.commit()
+            response_cache.invalidate(f"review:{id}", "reviews", "books", f"book:{review.book_id}")
             return review.to_dict(), 200
         except IntegrityError:
             db.session.rollback()
@@ -599,7 +1244,9 @@ class ReviewResource(Resource):
 
         try:
             db.session.delete(review)
+            Book.adjust_ratings(review.book_id, -1, -review.rating)
             db.session.commit()
+            response_cache.invalidate(f"review:{id}", "reviews", "books", f"book:{review.book_id}")
             return {"message": "Review deleted successfully"}, 200
         except IntegrityError:
             db.session.rollback()
@@ -607,11 +1254,62 @@ class ReviewResource(Resource):
 
 
 api.add_resource(ReviewResource, '/reviews', '/reviews/<int:id>')
+# Set-based helpers for reading list membership
+def is_book_id_list(value):
+    # bool is an int subclass, but true/false are never book IDs
+    return isinstance(value, list) and all(isinstance(i, int) and not isinstance(i, bool) for i in value)
+
+def count_existing_books(book_ids):
+    if not book_ids:
+        return 0
+    return db.session.scalar(db.select(func.count(Book.id)).where(Book.id.in_(book_ids)))
+
+def add_reading_list_books(reading_list_id, book_ids):
+    """Insert memberships for book_ids in one executemany"""
+    if book_ids:
+        db.session.execute(
+            db.insert(ReadingListBook),
+            [{"reading_list_id": reading_list_id, "book_id": book_id} for book_id in book_ids],
+        )
+
+def remove_reading_list_books(reading_list_id, book_ids):
+    """Delete memberships for book_ids in one statement"""
+    if book_ids:
+        db.session.execute(
+            db.delete(ReadingListBook).where(
+                ReadingListBook.reading_list_id == reading_list_id,
+                ReadingListBook.book_id.in_(book_ids),
+            )
+        )
+
+# Reading list views: the loader options each one needs, paired with its serializer.
+# Every level is a single SELECT ... IN, so a view costs one query per level.
+READING_LIST_VIEWS = {
+    'summary': ((), serializers.reading_list_summary),
+    'books': (
+        (selectinload(ReadingList.books).selectinload(ReadingListBook.book),),
+        serializers.reading_list_with_books_no_reviews,
+    ),
+    'full': (
+        (selectinload(ReadingList.books).selectinload(ReadingListBook.book).selectinload(Book.reviews),),
+        serializers.reading_list_with_books,
+    ),
+}
+
+def load_reading_lists(query, view):
+    options, serializer = READING_LIST_VIEWS[view]
+    return [serializer(reading_list) for reading_list in query.options(*options).all()]
+
+def reading_list_response(list_id):
+    """Reload a list after a write and render it the way to_dict(rules=("books",)) did"""
+    return load_reading_lists(ReadingList.query.filter_by(id=list_id), 'full')[0]
+
 # Resource: ReadingList
 class ReadingListResource(Resource):
     def get(self, list_id=None):
         if list_id:
-            reading_list = ReadingList.query.get(list_id)
+            options, _ = READING_LIST_VIEWS['full']
+            reading_list = ReadingList.query.options(*options).filter_by(id=list_id).first()
             if not reading_list:
                 return {'error': 'Reading list not found'}, 404
             return reading_list.to_dict(rules=("books", "user")), 200
@@ -619,9 +1317,11 @@ class ReadingListResource(Resource):
         user_id = request.args.get('user_id')
         if not user_id:
             return {'error': 'User ID is required'}, 400
+        view = request.args.get('view', 'books')
+        if view not in READING_LIST_VIEWS:
+            return {'error': f"View must be one of: {', '.join(READING_LIST_VIEWS)}"}, 400
 
-        reading_lists = ReadingList.query.filter_by(user_id=user_id).all()
-        return [rl.to_dict(rules=("books",)) for rl in reading_lists], 200
+        return load_reading_lists(ReadingList.query.filter_by(user_id=user_id), view), 200
 
     def post(self):
         data = request.get_json()
@@ -634,28 +1334,25 @@ class ReadingListResource(Resource):
         user = User.query.get(user_id)
         if not user:
             return {'error': 'User not found'}, 404
+        if not is_book_id_list(book_ids):
+            return {'error': 'book_ids must be a list of integer book IDs'}, 400
         if len(book_ids) != len(set(book_ids)):
             return {'error': 'Duplicate books are not allowed in the reading list'}, 400
 
         existing_reading_list = ReadingList.query.filter_by(user_id=user_id, name=name).first()
         if existing_reading_list:
             return {'error': 'A reading list with this name already exists for the user'}, 400
-        books = Book.query.filter(Book.id.in_(book_ids)).all()
-        if len(books) != len(book_ids):
+        if count_existing_books(book_ids) != len(book_ids):
             return {'error': 'One or more books not found'}, 404
       
         try:
             reading_list = ReadingList(name=name, user_id=user_id)
-           
-            for book_id in book_ids:
-                book = Book.query.get(book_id)
-                if book:
-                    reading_list_book = ReadingListBook(book=book, reading_list=reading_list)
-                    db.session.add(reading_list_book)
-
             db.session.add(reading_list)
+            db.session.flush()
+            add_reading_list_books(reading_list.id, book_ids)
             db.session.commit()
-            return reading_list.to_dict(rules=("books",)), 201
+            response_cache.invalidate("reading_lists")
+            return reading_list_response(reading_list.id), 201
         except IntegrityError:
             db.session.rollback()
             return {'error': 'Error creating reading list'}, 500
@@ -671,28 +1368,68 @@ class ReadingListResource(Resource):
         name = data.get('name')
         book_ids = data.get('book_ids', [])
 
+        if not is_book_id_list(book_ids):
+            return {'error': 'book_ids must be a list of integer book IDs'}, 400
         if name:
             reading_list.name = name
         if len(book_ids) != len(set(book_ids)):
             return {'error': 'Duplicate books are not allowed in the reading list'}, 400
-
-    
-        books = Book.query.filter(Book.id.in_(book_ids)).all()
-        if len(books) != len(book_ids):
+        if count_existing_books(book_ids) != len(book_ids):
             return {'error': 'One or more books not found'}, 404
-        
-        ReadingListBook.query.filter_by(reading_list_id=reading_list.id).delete()
-        for book in books:
-            reading_list_book = ReadingListBook(book=book, reading_list=reading_list)
-            db.session.add(reading_list_book)
+
+        # Only touch the memberships that changed; the rest keep their notes and ratings
+        current_ids = set(db.session.scalars(
+            db.select(ReadingListBook.book_id).filter_by(reading_list_id=reading_list.id)
+        ))
+        wanted_ids = set(book_ids)
 
         try:
+            remove_reading_list_books(reading_list.id, current_ids - wanted_ids)
+            add_reading_list_books(reading_list.id, [b for b in book_ids if b not in current_ids])
             db.session.commit()
-            return reading_list.to_dict(rules=("books",)), 200
+            response_cache.invalidate("reading_lists")
+            return reading_list_response(reading_list.id), 200
         except IntegrityError:
             db.session.rollback()
             return {'error': 'Error updating reading list'}, 500
 
+    def patch(self, list_id):
+        """Add and/or remove individual books without rewriting the list"""
+        data = request.get_json() or {}
+        add_ids = data.get('add', [])
+        remove_ids = data.get('remove', [])
+
+        if not is_book_id_list(add_ids) or not is_book_id_list(remove_ids):
+            return {'error': 'add and remove must be lists of integer book IDs'}, 400
+        if set(add_ids) & set(remove_ids):
+            return {'error': 'A book cannot be both added and removed'}, 400
+
+        reading_list = ReadingList.query.get(list_id)
+        if not reading_list:
+            return {'error': 'Reading list not found'}, 404
+
+        add_ids = list(dict.fromkeys(add_ids))
+        if count_existing_books(add_ids) != len(add_ids):
+            return {'error': 'One or more books not found'}, 404
+
+        # Adding a book that is already on the list is a no-op
+        already_listed = set(db.session.scalars(
+            db.select(ReadingListBook.book_id).where(
+                ReadingListBook.reading_list_id == reading_list.id,
+                ReadingListBook.book_id.in_(add_ids),
+            )
+        )) if add_ids else set()
+
+        try:
+            remove_reading_list_books(reading_list.id, remove_ids)
+            add_reading_list_books(reading_list.id, [b for b in add_ids if b not in already_listed])
+            db.session.commit()
+            response_cache.invalidate("reading_lists")
+            return reading_list_response(reading_list.id), 200
+        except IntegrityError:
+            db.session.rollback()
+            return {'error': 'Error updating reading list'}, 409
+
     def delete(self, list_id):
         reading_list = ReadingList.query.get(list_id)
 
@@ -703,6 +1440,7 @@ class ReadingListResource(Resource):
             ReadingListBook.query.filter_by(reading_list_id=reading_list.id).delete()
             db.session.delete(reading_list)
             db.session.commit()
+            response_cache.invalidate("reading_lists")
             return {'message': 'Reading list deleted'}, 200
         except IntegrityError:
             db.session.rollback()
@@ -0,0 +1,64 @@
+"""Micro-benchmark: compiled serializers vs the SerializerMixin walk
+
+Loads up to --limit rows of each model from the configured database, checks
+that both paths produce identical dicts, then times them. Run from the repo
+root:
+
+    python -m benchmarks.bench_serializers --limit 500 --repeat 5
+
+Relationships are loaded during a warm-up pass, so the timed passes measure
+serialization alone in both paths.
+"""
+import argparse
+import json
+import timeit
+from sqlalchemy_serializer import SerializerMixin
+from config import app
+from models import User, Review, ReadingList
+from serializers import SERIALIZERS
+from fast_json import orjson
+
+SHAPES = [
+    (Review, ()),
+    (ReadingList, ('books',)),
+    (ReadingList, ('books', 'user')),
+    (User, ()),
+]
+
+
+def run(limit, repeat):
+    for model, rules in SHAPES:
+        objects = model.query.limit(limit).all()
+        if not objects:
+            print(f"{model.__name__:<12} {str(rules):<20} no rows, skipped")
+            continue
+        compiled = SERIALIZERS[(model.__name__, rules)]
+
+        mixin_out = [SerializerMixin.to_dict(obj, rules=rules) for obj in objects]
+        compiled_out = [compiled(obj) for obj in objects]
+        if mixin_out != compiled_out:
+            raise SystemExit(f"{model.__name__} {rules}: compiled output differs from SerializerMixin")
+
+        mixin_time = min(timeit.repeat(
+            lambda: [SerializerMixin.to_dict(obj, rules=rules) for obj in objects], number=1, repeat=repeat))
+        compiled_time = min(timeit.repeat(
+            lambda: [compiled(obj) for obj in objects], number=1, repeat=repeat))
+        print(f"{model.__name__:<12} {str(rules):<20} rows={len(objects):<6} "
+              f"mixin={mixin_time * 1000:8.2f}ms compiled={compiled_time * 1000:8.2f}ms "
+              f"speedup={mixin_time / compiled_time:5.1f}x")
+
+        stdlib_time = min(timeit.repeat(lambda: json.dumps(compiled_out), number=1, repeat=repeat))
+        if orjson is not None:
+            orjson_time = min(timeit.repeat(lambda: orjson.dumps(compiled_out), number=1, repeat=repeat))
+            print(f"{'':<12} {'json encode':<20} {'':<11} "
+                  f"stdlib={stdlib_time * 1000:7.2f}ms orjson={orjson_time * 1000:8.2f}ms "
+                  f"speedup={stdlib_time / orjson_time:5.1f}x")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--limit', type=int, default=500, help='rows per model')
+    parser.add_argument('--repeat', type=int, default=5, help='timing repetitions (best is reported)')
+    args = parser.parse_args()
+    with app.app_context():
+        run(args.limit, args.repeat)
@@ -0,0 +1,218 @@
+"""Synthetic dataset generator for load testing
+
+Bulk-inserts users, books, reviews, reading lists and reading progress with
+a realistic skew: a few books get most of the reviews, list entries and
+readers, and a few users do most of the reviewing and reading. Run from the
+repo root against the configured database:
+
+    python -m benchmarks.generate_data --users 10000 --books 100000 --reviews 500000
+
+--reset drops and recreates every table first, like seed.py. Without it the
+rows are added to what is already there. Every generated user has the
+username bench_user_<n> and the password given by --password, so the load
+test can log in as them.
+"""
+import argparse
+import itertools
+import random
+import time
+from datetime import datetime, timedelta
+from config import db, app, password_hasher
+from models import User, Book, Review, ReadingList, ReadingListBook, ReadingProgress
+
+USERNAME_PREFIX = 'bench_user'
+DEFAULT_PASSWORD = 'benchmark-password'
+
+GENRES = [
+    'Fiction', 'Non-Fiction', 'Fantasy', 'Science Fiction', 'Mystery', 'Thriller', 'Romance',
+    'Biography', 'History', 'Self-Help', 'Business', 'Poetry', 'Horror', 'Philosophy', 'Science',
+]
+# Also used by the load test to build search queries that hit
+VOCABULARY = [
+    'river', 'empire', 'shadow', 'garden', 'winter', 'machine', 'ocean', 'letters', 'silence',
+    'kingdom', 'engine', 'forest', 'city', 'dream', 'fire', 'memory', 'stone', 'light', 'war',
+    'journey', 'secret', 'island', 'mountain', 'storm', 'market', 'family', 'code', 'star',
+    'night', 'house', 'road', 'music', 'money', 'power', 'habit', 'mind', 'science', 'history',
+]
+ADJECTIVES = [
+    'Silent', 'Broken', 'Golden', 'Hidden', 'Last', 'Lost', 'Burning', 'Quiet', 'Endless',
+    'Little', 'Great', 'Secret', 'Red', 'Northern', 'Wild', 'Hollow', 'Bright', 'Distant',
+]
+FIRST_NAMES = ['Amara', 'James', 'Wanjiru', 'Li', 'Maria', 'Kofi', 'Elena', 'Omar', 'Grace', 'Ravi', 'Sofia', 'David']
+LAST_NAMES = ['Otieno', 'Smith', 'Kamau', 'Chen', 'Garcia', 'Mensah', 'Petrova', 'Hassan', 'Njeri', 'Patel', 'Rossi', 'Brown']
+# Mostly favourable ratings, as on most review sites
+RATING_WEIGHTS = [5, 8, 20, 35, 32]
+
+
+class SkewedSampler:
+    """Pick ids with Zipf-like popularity: the item at rank r has weight 1 / r**s
+
+    Ranks are assigned to a shuffled copy of the ids, so popularity is not
+    correlated with insertion order.
+    """
+
+    def __init__(self, ids, skew, rng):
+        self.ids = list(ids)
+        rng.shuffle(self.ids)
+        self.cum_weights = list(itertools.accumulate(1 / rank ** skew for rank in range(1, len(self.ids) + 1)))
+        self.rng = rng
+
+    def sample(self, k=1):
+        return self.rng.choices(self.ids, cum_weights=self.cum_weights, k=k)
+
+
+def words(rng, low, high):
+    return ' '.join(rng.choice(VOCABULARY) for _ in range(rng.randint(low, high)))
+
+
+def random_past(rng, now, days):
+    return now - timedelta(seconds=rng.randint(0, days * 24 * 3600))
+
+
+def insert_batches(model, rows, batch_size, label):
+    """executemany-insert rows in batches of batch_size, committing each; returns the count"""
+    started = time.perf_counter()
+    total = 0
+    rows = iter(rows)
+    while True:
+        batch = list(itertools.islice(rows, batch_size))
+        if not batch:
+            break
+        db.session.execute(db.insert(model), batch)
+        db.session.commit()
+        total += len(batch)
+        print(f"\r{label}: {total}", end='', flush=True)
+    print(f"\r{label}: {total} in {time.perf_counter() - started:.1f}s")
+    return total
+
+
+def new_ids(model, after):
+    return db.session.scalars(db.select(model.id).where(model.id > after).order_by(model.id)).all()
+
+
+def max_id(model):
+    return db.session.scalar(db.select(db.func.max(model.id))) or 0
+
+
+def unique_pairs(count, left, right, max_attempts_factor=5):
+    """Yield up to count distinct (left, right) pairs drawn from the two samplers"""
+    seen = set()
+    attempts = 0
+    while len(seen) < count and attempts < count * max_attempts_factor:
+        attempts += 1
+        pair = (left.sample()[0], right.sample()[0])
+        if pair not in seen:
+            seen.add(pair)
+            yield pair
+
+
+def generate(args):
+    rng = random.Random(args.seed)
+    now = datetime.utcnow()
+
+    if args.reset:
+        db.drop_all()
+        db.create_all()
+
+    # One hash shared by every generated user: hashing millions of passwords would dominate the run
+    password_hash = password_hasher.hash(args.password)
+    first_user = max_id(User) + 1
+    insert_batches(User, (
+        {'username': f"{USERNAME_PREFIX}_{first_user + i}", 'password_hash': password_hash}
+        for i in range(args.users)
+    ), args.batch_size, 'users')
+    user_ids = new_ids(User, first_user - 1)
+
+    before = max_id(Book)
+    authors = [f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}" for _ in range(max(1, args.books // 20))]
+    author_sampler = SkewedSampler(range(len(authors)), args.skew, rng)
+    insert_batches(Book, (
+        {
+            'title': f"The {rng.choice(ADJECTIVES)} {rng.choice(VOCABULARY).capitalize()}",
+            'author': authors[author_sampler.sample()[0]],
+            'genre': rng.choice(GENRES),
+            'description': words(rng, 20, 60),
+            'page_count': rng.randint(40, 900),
+            'publication_year': rng.randint(1900, now.year),
+            'image_url': f"https://example.com/covers/{i}.jpg",
+            'is_pdf': False,
+            'upload_date': random_past(rng, now, 3 * 365),
+            'review_count': 0,
+            'rating_sum': 0,
+        }
+        for i in range(args.books)
+    ), args.batch_size, 'books')
+    book_ids = new_ids(Book, before)
+    if not user_ids or not book_ids:
+        return
+
+    users = SkewedSampler(user_ids, args.skew, rng)
+    books = SkewedSampler(book_ids, args.skew, rng)
+
+    insert_batches(Review, (
+        {
+            'user_id': user_id,
+            'book_id': book_id,
+            'review_text': words(rng, 5, 40),
+            'rating': rng.choices(range(1, 6), weights=RATING_WEIGHTS)[0],
+            'created_at': random_past(rng, now, 2 * 365),
+        }
+        for user_id, book_id in unique_pairs(args.reviews, users, books)
+    ), args.batch_size, 'reviews')
+
+    before = max_id(ReadingList)
+    insert_batches(ReadingList, (
+        {
+            'name': f"{rng.choice(ADJECTIVES)} reads {i}",
+            'user_id': users.sample()[0],
+            'created_at': random_past(rng, now, 365),
+            'updated_at': now,
+        }
+        for i in range(args.reading_lists)
+    ), args.batch_size, 'reading lists')
+    list_ids = new_ids(ReadingList, before)
+
+    def list_entries():
+        for list_id in list_ids:
+            for book_id in set(books.sample(rng.randint(1, args.max_list_size))):
+                yield {
+                    'reading_list_id': list_id,
+                    'book_id': book_id,
+                    'rating': rng.choice([None, None, 3, 4, 5]),
+                }
+    insert_batches(ReadingListBook, list_entries(), args.batch_size, 'reading list entries')
+
+    insert_batches(ReadingProgress, (
+        {
+            'user_id': user_id,
+            'book_id': book_id,
+            'current_page': rng.randint(1, 900),
+            'percentage': rng.randint(0, 100),
+            'last_read': random_past(rng, now, 90),
+        }
+        for user_id, book_id in unique_pairs(args.progress, users, books)
+    ), args.batch_size, 'reading progress')
+
+    # Core inserts skip the ORM hooks, so fill in search vectors and rating aggregates set-wise
+    started = time.perf_counter()
+    Book.update_search_vector()
+    fixed = Book.reconcile_ratings()
+    print(f"search vectors and rating aggregates for {fixed} books in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--books', type=int, default=10000)
+    parser.add_argument('--reviews', type=int, default=50000)
+    parser.add_argument('--reading-lists', type=int, default=2000)
+    parser.add_argument('--max-list-size', type=int, default=30, help='books per reading list, at most')
+    parser.add_argument('--progress', type=int, default=20000, help='reading progress rows')
+    parser.add_argument('--skew', type=float, default=1.1, help='Zipf exponent for popularity; 0 is uniform')
+    parser.add_argument('--batch-size', type=int, default=5000, help='rows per executemany batch')
+    parser.add_argument('--seed', type=int, default=42, help='random seed, for repeatable datasets')
+    parser.add_argument('--password', default=DEFAULT_PASSWORD, help='password for every generated user')
+    parser.add_argument('--reset', action='store_true', help='drop and recreate all tables first')
+    args = parser.parse_args()
+    with app.app_context():
+        generate(args)
@@ -0,0 +1,305 @@
+"""Load test: drive the real app through common scenarios and report latency
+
+Runs each scenario for --requests requests on --concurrency threads, either
+in-process through Flask's test client (--target client) or over HTTP
+against a local gunicorn it starts itself (--target gunicorn). Reports
+p50/p95/p99 latency, throughput, error count and SQL statements per request,
+the last read from /metrics. Run from the repo root against a database
+filled by benchmarks.generate_data:
+
+    python -m benchmarks.run_load --target client --requests 500 --concurrency 8
+    python -m benchmarks.run_load --target gunicorn --scenarios catalog,search --json results.json
+
+SQL per request is only reported for a single gunicorn worker, since each
+worker keeps its own metrics.
+"""
+import argparse
+import json
+import math
+import os
+import random
+import re
+import subprocess
+import sys
+import threading
+import time
+import requests
+from app import app
+from config import db
+from models import User, Book, ReadingList
+from benchmarks.generate_data import USERNAME_PREFIX, DEFAULT_PASSWORD, VOCABULARY
+
+SQL_SAMPLE_RE = re.compile(r'^http_request_sql_statements_(sum|count)\{endpoint="([^"]*)"\} (\S+)$', re.M)
+
+
+# Scenarios: (rng, data, user) -> (method, path, json body). user is the
+# (id, username) the calling thread is logged in as.
+def catalog(rng, data, user):
+    sort = rng.choice(['id', 'upload_date', 'rating'])
+    return 'GET', f"/books?sort={sort}&limit=20", None
+
+def book_detail(rng, data, user):
+    return 'GET', f"/books/{rng.choice(data['book_ids'])}", None
+
+def search(rng, data, user):
+    terms = ' '.join(rng.sample(VOCABULARY, rng.randint(1, 2)))
+    return 'GET', f"/search?q={terms}", None
+
+def login(rng, data, user):
+    username = rng.choice(data['users'])[1]
+    return 'POST', '/login', {'username': username, 'password': data['password']}
+
+def progress_update(rng, data, user):
+    return 'POST', '/reading-progress', {
+        'book_id': rng.choice(data['book_ids']),
+        'page': rng.randint(1, 300),
+        'percentage': rng.randint(0, 100),
+    }
+
+def shelf(rng, data, user):
+    return 'GET', '/reading-progress?recent=10', None
+
+def reading_list_edit(rng, data, user):
+    list_id = rng.choice(data['lists'][user[0]])
+    book_id = rng.choice(data['book_ids'])
+    change = 'add' if rng.random() < 0.5 else 'remove'
+    return 'PATCH', f"/reading-lists/{list_id}", {change: [book_id]}
+
+SCENARIOS = {
+    'catalog': catalog,
+    'book_detail': book_detail,
+    'search': search,
+    'login': login,
+    'progress_update': progress_update,
+    'shelf': shelf,
+    'reading_list_edit': reading_list_edit,
+}
+
+
+def load_data(sample_size, password):
+    """Ids and bench users to aim requests at, sampled from the database"""
+    with app.app_context():
+        book_ids = db.session.scalars(db.select(Book.id).order_by(db.func.random()).limit(sample_size)).all()
+        users = db.session.execute(
+            db.select(User.id, User.username)
+            .where(User.username.like(f"{USERNAME_PREFIX}_%"))
+            .where(User.id.in_(db.select(ReadingList.user_id)))
+            .order_by(db.func.random()).limit(sample_size)
+        ).all()
+        lists = {}
+        for list_id, user_id in db.session.execute(
+            db.select(ReadingList.id, ReadingList.user_id).where(ReadingList.user_id.in_([u.id for u in users]))
+        ):
+            lists.setdefault(user_id, []).append(list_id)
+    if not book_ids or not users:
+        raise SystemExit("No benchmark data found; run python -m benchmarks.generate_data first")
+    return {'book_ids': book_ids, 'users': [tuple(u) for u in users], 'lists': lists, 'password': password}
+
+
+class ClientTarget:
+    """In-process requests through Flask's test client, one client per thread"""
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+    def session(self, user):
+        local = self._local
+        if getattr(local, 'user', None) != user:
+            local.client = app.test_client()
+            # Session cookies are Secure, so talk to the client over https
+            with local.client.session_transaction(base_url='https://localhost') as sess:
+                sess['user_id'] = user[0]
+            local.user = user
+        return local.client
+
+    def request(self, user, method, path, body):
+        response = self.session(user).open(path, method=method, json=body, base_url='https://localhost')
+        return response.status_code
+
+    def metrics(self):
+        return app.test_client().get('/metrics').get_data(as_text=True)
+
+
+class GunicornTarget:
+    """HTTP requests against a gunicorn started on a local port"""
+
+    def __init__(self, workers, threads, port, password):
+        self.workers = workers
+        self.threads = threads
+        self.base_url = f"http://127.0.0.1:{port}"
+        self.password = password
+        self._process = None
+        self._local = threading.local()
+
+    def start(self):
+        self._process = subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn', '--workers', str(self.workers), '--threads', str(self.threads),
+             '--bind', self.base_url.split('//')[1], 'app:app'],
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        )
+        deadline = time.time() + 30
+        while time.time() < deadline:
+            try:
+                if requests.get(self.base_url + '/health', timeout=1).ok:
+                    return
+            except requests.ConnectionError:
+                time.sleep(0.2)
+        self.stop()
+        raise SystemExit("gunicorn did not come up within 30s")
+
+    def stop(self):
+        if self._process is not None:
+            self._process.terminate()
+            self._process.wait(timeout=30)
+            self._process = None
+
+    def session(self, user):
+        local = self._local
+        if getattr(local, 'user', None) != user:
+            http = requests.Session()
+            response = http.post(self.base_url + '/login', json={'username': user[1], 'password': self.password})
+            response.raise_for_status()
+            # The session cookie is Secure, which requests won't send over plain http; send it by hand
+            http.headers['Cookie'] = f"session={response.cookies['session']}"
+            local.http, local.user = http, user
+        return local.http
+
+    def request(self, user, method, path, body):
+        return self.session(user).request(method, self.base_url + path, json=body).status_code
+
+    def metrics(self):
+        return requests.get(self.base_url + '/metrics').text
+
+
+def sql_totals(metrics_text):
+    """(statements, requests) summed over every endpoint but /metrics itself"""
+    totals = {'sum': 0.0, 'count': 0.0}
+    for kind, endpoint, value in SQL_SAMPLE_RE.findall(metrics_text):
+        if endpoint != '/metrics':
+            totals[kind] += float(value)
+    return totals['sum'], totals['count']
+
+
+def percentile(sorted_values, p):
+    # Nearest-rank percentile
+    return sorted_values[max(0, math.ceil(p / 100 * len(sorted_values)) - 1)]
+
+
+def run_scenario(target, name, data, total, concurrency, seed, report_sql):
+    scenario = SCENARIOS[name]
+    thread_users = [data['users'][i % len(data['users'])] for i in range(concurrency)]
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+    # Threads log in, then all start together once the clock and SQL counters are read
+    logged_in = threading.Barrier(concurrency + 1)
+    go = threading.Barrier(concurrency + 1)
+
+    def worker(index):
+        nonlocal errors
+        rng = random.Random(seed * 1000 + index)
+        user = thread_users[index]
+        try:
+            target.session(user)
+        finally:
+            logged_in.wait()
+        go.wait()
+        for _ in range(index, total, concurrency):
+            method, path, body = scenario(rng, data, user)
+            started = time.perf_counter()
+            try:
+                status = target.request(user, method, path, body)
+            except Exception:
+                status = 599  # Connection or app error; counted, not fatal
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies.append(elapsed)
+                if status >= 400:
+                    errors += 1
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    logged_in.wait()
+    before = sql_totals(target.metrics()) if report_sql else None
+    started = time.perf_counter()
+    go.wait()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - started
+
+    queries = None
+    if report_sql:
+        after = sql_totals(target.metrics())
+        handled = after[1] - before[1]
+        queries = (after[0] - before[0]) / handled if handled else None
+
+    latencies.sort()
+    if not latencies:
+        raise SystemExit(f"{name}: no requests completed")
+    return {
+        'scenario': name,
+        'requests': len(latencies),
+        'errors': errors,
+        'throughput_rps': len(latencies) / wall,
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p95_ms': percentile(latencies, 95) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000,
+        'queries_per_request': queries,
+    }
+
+
+def print_results(results):
+    print(f"{'scenario':<18} {'reqs':>6} {'errors':>6} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'sql/req':>8}")
+    for r in results:
+        queries = f"{r['queries_per_request']:8.1f}" if r['queries_per_request'] is not None else f"{'n/a':>8}"
+        print(f"{r['scenario']:<18} {r['requests']:>6} {r['errors']:>6} {r['throughput_rps']:8.1f} "
+              f"{r['p50_ms']:8.1f} {r['p95_ms']:8.1f} {r['p99_ms']:8.1f} {queries}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--target', choices=['client', 'gunicorn'], default='client')
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS), help='comma-separated; default all')
+    parser.add_argument('--requests', type=int, default=200, help='requests per scenario')
+    parser.add_argument('--concurrency', type=int, default=4, help='client threads')
+    parser.add_argument('--workers', type=int, default=1, help='gunicorn workers')
+    parser.add_argument('--threads', type=int, default=8, help='threads per gunicorn worker')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--password', default=DEFAULT_PASSWORD, help='password of the generated users')
+    parser.add_argument('--sample-size', type=int, default=1000, help='books and users to aim requests at')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--json', help='also write the results to this file')
+    args = parser.parse_args()
+
+    names = [name.strip() for name in args.scenarios.split(',') if name.strip()]
+    unknown = [name for name in names if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(unknown)}")
+
+    data = load_data(args.sample_size, args.password)
+    if args.target == 'client':
+        target = ClientTarget()
+    else:
+        target = GunicornTarget(args.workers, args.threads, args.port, args.password)
+    report_sql = args.target == 'client' or args.workers == 1
+
+    target.start()
+    try:
+        results = [
+            run_scenario(target, name, data, args.requests, args.concurrency, args.seed, report_sql)
+            for name in names
+        ]
+    finally:
+        target.stop()
+
+    print_results(results)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'target': args.target, 'concurrency': args.concurrency, 'results': results}, f, indent=2)
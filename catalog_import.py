@@ -0,0 +1,198 @@
+import csv
+import io
+import json
+from datetime import datetime
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from config import db, response_cache
+from models import Book
+
+try:
+    from psycopg2 import Error as Psycopg2Error
+except ImportError:  # Only the COPY path needs it, and that only runs on psycopg2
+    Psycopg2Error = DBAPIError
+
+IMPORT_FORMATS = ('csv', 'jsonl')
+TEXT_FIELDS = ('title', 'author', 'genre', 'description', 'image_url')
+INT_FIELDS = ('page_count', 'publication_year')
+IMPORT_COLUMNS = TEXT_FIELDS + INT_FIELDS
+REQUIRED_FIELDS = ('title', 'author')
+# Fields the Book validators check, which refuse a missing value too
+CHECKED_TEXT_FIELDS = ('title', 'author', 'genre')
+# Names the API uses for a column, accepted in import files too
+FIELD_ALIASES = {'cover_url': 'image_url'}
+
+
+class ImportFormatError(ValueError):
+    """The file as a whole can't be imported, as opposed to one bad row"""
+
+
+def iter_records(stream, fmt):
+    """Yield (line number, record dict or None, parse error or None) from a binary stream"""
+    if not isinstance(stream, io.BufferedIOBase):
+        stream = io.BufferedReader(stream)
+    text_stream = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+
+    if fmt == 'csv':
+        reader = csv.DictReader(text_stream)
+        header = {FIELD_ALIASES.get(name, name) for name in (reader.fieldnames or [])}
+        missing = [field for field in REQUIRED_FIELDS if field not in header]
+        if missing:
+            raise ImportFormatError(f"CSV header is missing: {', '.join(missing)}")
+        for record in reader:
+            yield reader.line_num, record, None
+    elif fmt == 'jsonl':
+        for line_number, line in enumerate(text_stream, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                yield line_number, None, "Invalid JSON."
+                continue
+            if not isinstance(record, dict):
+                yield line_number, None, "Each line must be a JSON object."
+                continue
+            yield line_number, record, None
+    else:
+        raise ImportFormatError(f"Format must be one of: {', '.join(IMPORT_FORMATS)}")
+
+
+def clean_record(record):
+    """Turn a raw record into a books row, checked like the Book validators; returns (row, errors)"""
+    record = {FIELD_ALIASES.get(key, key): value for key, value in record.items() if key}
+    row = {}
+    errors = []
+
+    for field in TEXT_FIELDS:
+        value = record.get(field)
+        if isinstance(value, str):
+            value = value.strip() or None
+        elif value is not None:
+            errors.append(f"{field.capitalize()} must be a string.")
+            continue
+        try:
+            if field in CHECKED_TEXT_FIELDS:
+                Book.check_book_field(field, value)
+            elif value is None:
+                row[field] = None
+                continue
+            # The model doesn't check these, but Postgres rejects NUL characters and over-long values
+            if '\x00' in value:
+                raise ValueError(f"{field.capitalize()} cannot contain NUL characters.")
+            max_length = Book.__table__.c[field].type.length
+            if max_length and len(value) > max_length:
+                raise ValueError(f"{field.capitalize()} must be at most {max_length} characters.")
+            row[field] = value
+        except ValueError as e:
+            errors.append(str(e))
+
+    for field in INT_FIELDS:
+        value = record.get(field)
+        if isinstance(value, str):
+            value = value.strip() or None
+            if value is not None:
+                try:
+                    value = int(value)
+                except ValueError:
+                    pass  # Left as a string so the check below reports it
+        try:
+            row[field] = Book.check_numeric_field(field, value)
+        except ValueError as e:
+            errors.append(str(e))
+
+    return row, errors
+
+
+class BookImporter:
+    """Stream a CSV or JSONL catalog into books in large batches
+
+    Each batch is validated row by row, written in one go (COPY through a
+    temporary table on psycopg2, an executemany INSERT elsewhere), given
+    search vectors set-wise and committed. Rows that fail validation, or
+    that the database rejects, are passed to on_error with their line
+    number and don't stop the import.
+    """
+
+    def __init__(self, batch_size=5000, on_error=None):
+        self.batch_size = batch_size
+        self.on_error = on_error or (lambda line, errors: None)
+        self.imported = 0
+        self.failed = 0
+
+    def run(self, stream, fmt):
+        batch = []
+        for line, record, parse_error in iter_records(stream, fmt):
+            if parse_error:
+                self._reject(line, [parse_error])
+                continue
+            row, errors = clean_record(record)
+            if errors:
+                self._reject(line, errors)
+                continue
+            batch.append((line, row))
+            if len(batch) >= self.batch_size:
+                self._write(batch)
+                batch = []
+        if batch:
+            self._write(batch)
+        if self.imported:
+            response_cache.invalidate("books")
+        return {"imported": self.imported, "failed": self.failed}
+
+    def _reject(self, line, errors):
+        self.failed += 1
+        self.on_error(line, errors)
+
+    def _write(self, batch):
+        rows = [row for _, row in batch]
+        try:
+            ids = self._copy(rows) if self._can_copy() else self._insert(rows)
+            Book.update_search_vector(ids)  # Commits the batch
+            self.imported += len(ids)
+            return
+        except (DBAPIError, Psycopg2Error):
+            # COPY runs on the raw psycopg2 cursor, so its errors aren't wrapped in DBAPIError
+            db.session.rollback()
+
+        # Something in the batch was refused; retry row by row to find out what
+        for line, row in batch:
+            try:
+                Book.update_search_vector(self._insert([row]))
+                self.imported += 1
+            except DBAPIError as e:
+                db.session.rollback()
+                self._reject(line, [str(e.orig).strip().splitlines()[0]])
+
+    @staticmethod
+    def _can_copy():
+        return db.session.get_bind().dialect.driver == 'psycopg2'
+
+    @staticmethod
+    def _insert(rows):
+        result = db.session.execute(db.insert(Book).returning(Book.id), rows)
+        return result.scalars().all()
+
+    @staticmethod
+    def _copy(rows):
+        columns = ', '.join(IMPORT_COLUMNS)
+        cursor = db.session.connection().connection.dbapi_connection.cursor()
+        cursor.execute(
+            "CREATE TEMP TABLE IF NOT EXISTS book_import ("
+            "title text, author text, genre text, description text, image_url text, "
+            "page_count integer, publication_year integer"
+            ") ON COMMIT DELETE ROWS"
+        )
+        # In COPY's CSV format an unquoted empty field is NULL, which is how csv writes None
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows([row[column] for column in IMPORT_COLUMNS] for row in rows)
+        buffer.seek(0)
+        cursor.copy_expert(f"COPY book_import ({columns}) FROM STDIN WITH (FORMAT csv)", buffer)
+        result = db.session.execute(
+            text(
+                f"INSERT INTO books ({columns}, is_pdf, upload_date, review_count, rating_sum) "
+                f"SELECT {columns}, false, :now, 0, 0 FROM book_import RETURNING id"
+            ),
+            {"now": datetime.utcnow()},
+        )
+        return result.scalars().all()
@@ -6,15 +6,27 @@ from flask_sqlalchemy import SQLAlchemy
 from sqlalchemy import MetaData
 from dotenv import load_dotenv
 from flask_cors import CORS
+from passwords import PasswordHasher
+from fast_json import install_fast_json
+from response_cache import ResponseCache, make_backend
+from sessions import ServerSessionInterface, PrincipalCache, make_session_store
 
 
+import logging
 import os
+import tempfile
 
 
 # Load environment variables from .env
 load_dotenv()
 
 
+# Log level comes from the environment so debug output stays off in production
+logging.basicConfig(
+    level=os.getenv('LOG_LEVEL', 'INFO').upper(),
+    format='%(asctime)s level=%(levelname)s logger=%(name)s %(message)s',
+)
+
 app = Flask(__name__)
 app.secret_key = os.getenv('SECRET_KEY')
 app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('SQLALCHEMY_DATABASE_URI')
@@ -23,6 +35,57 @@ app.config['SESSION_COOKIE_HTTPONLY'] = True  # Ensures cookie can't be accessed
 app.config['SESSION_COOKIE_SECURE'] = True  # Ensures cookie is only sent over HTTPS
 app.config['SESSION_COOKIE_SAMESITE'] = 'None'  # Prevents cookies from being sent with cross-site requests
 
+# Local disk cache for PDFs served by /pdf-proxy
+app.config['PDF_CACHE_DIR'] = os.getenv('PDF_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'book_app_pdf_cache'))
+app.config['PDF_CACHE_MAX_BYTES'] = int(os.getenv('PDF_CACHE_MAX_BYTES', 2 * 1024 * 1024 * 1024))  # 2GB
+
+# Outbound HTTP to Cloudinary (timeouts in seconds)
+app.config['CLOUDINARY_POOL_SIZE'] = int(os.getenv('CLOUDINARY_POOL_SIZE', 10))
+app.config['CLOUDINARY_CONNECT_TIMEOUT'] = float(os.getenv('CLOUDINARY_CONNECT_TIMEOUT', 5))
+app.config['CLOUDINARY_READ_TIMEOUT'] = float(os.getenv('CLOUDINARY_READ_TIMEOUT', 30))
+app.config['CLOUDINARY_RETRIES'] = int(os.getenv('CLOUDINARY_RETRIES', 2))
+app.config['PDF_PROXY_CHUNK_SIZE'] = int(os.getenv('PDF_PROXY_CHUNK_SIZE', 256 * 1024))
+
+# 'proxy' streams PDFs through this app; 'redirect' sends logged-in readers to a short-lived signed Cloudinary URL
+app.config['PDF_DELIVERY_MODE'] = os.getenv('PDF_DELIVERY_MODE', 'proxy')
+app.config['PDF_SIGNED_URL_TTL'] = int(os.getenv('PDF_SIGNED_URL_TTL', 300))
+
+# Background PDF ingestion: uploads are staged on disk and processed by a local thread pool
+app.config['INGEST_WORKERS'] = int(os.getenv('INGEST_WORKERS', 2))
+app.config['UPLOAD_STAGING_DIR'] = os.getenv('UPLOAD_STAGING_DIR', os.path.join(tempfile.gettempdir(), 'book_app_uploads'))
+app.config['UPLOAD_MAX_BYTES'] = int(os.getenv('UPLOAD_MAX_BYTES', 10 * 1024 * 1024))  # 10MB per uploaded file
+app.config['CHUNKED_UPLOAD_MAX_BYTES'] = int(os.getenv('CHUNKED_UPLOAD_MAX_BYTES', 500 * 1024 * 1024))  # 500MB per resumable upload
+app.config['CHUNKED_UPLOAD_CHUNK_BYTES'] = int(os.getenv('CHUNKED_UPLOAD_CHUNK_BYTES', 8 * 1024 * 1024))  # Largest single chunk PUT
+app.config['CHUNKED_UPLOAD_TTL'] = int(os.getenv('CHUNKED_UPLOAD_TTL', 24 * 60 * 60))  # Seconds an unfinished upload lives after its last chunk
+app.config['CLOUDINARY_UPLOAD_CHUNK_SIZE'] = int(os.getenv('CLOUDINARY_UPLOAD_CHUNK_SIZE', 6 * 1024 * 1024))  # Cloudinary minimum is 5MB
+
+# Password hashing: bcrypt work factor and the process pool it runs on (0 workers hashes inline)
+app.config['BCRYPT_LOG_ROUNDS'] = int(os.getenv('BCRYPT_LOG_ROUNDS', 12))
+app.config['BCRYPT_POOL_SIZE'] = int(os.getenv('BCRYPT_POOL_SIZE', 2))
+app.config['BCRYPT_MAX_QUEUE'] = int(os.getenv('BCRYPT_MAX_QUEUE', 64))
+
+# Reading progress writes: 0 upserts on every request; otherwise updates are coalesced in memory and flushed this often
+app.config['READING_PROGRESS_FLUSH_MS'] = int(os.getenv('READING_PROGRESS_FLUSH_MS', 0))
+
+# Cached GET /books and /reviews responses: seconds to keep them (0 disables), per-worker LRU size,
+# or a redis:// URL to share entries and invalidations between workers
+app.config['RESPONSE_CACHE_TTL'] = int(os.getenv('RESPONSE_CACHE_TTL', 0))
+app.config['RESPONSE_CACHE_MAX_ENTRIES'] = int(os.getenv('RESPONSE_CACHE_MAX_ENTRIES', 1024))
+app.config['RESPONSE_CACHE_URL'] = os.getenv('RESPONSE_CACHE_URL')
+
+# Bulk catalog import: rows per write, and how many row errors POST /books/import reports back
+app.config['BOOK_IMPORT_BATCH_SIZE'] = int(os.getenv('BOOK_IMPORT_BATCH_SIZE', 5000))
+app.config['BOOK_IMPORT_MAX_REPORTED_ERRORS'] = int(os.getenv('BOOK_IMPORT_MAX_REPORTED_ERRORS', 1000))
+
+# Server-side sessions: sqlite:///path or a redis:// URL keeps session data out of the cookie so it can be revoked
+# (unset keeps Flask's signed-cookie sessions). Logged-in users are cached in each worker for PRINCIPAL_CACHE_TTL seconds.
+app.config['SESSION_STORE_URL'] = os.getenv('SESSION_STORE_URL')
+app.config['PRINCIPAL_CACHE_TTL'] = int(os.getenv('PRINCIPAL_CACHE_TTL', 60))
+app.config['PRINCIPAL_CACHE_MAX_ENTRIES'] = int(os.getenv('PRINCIPAL_CACHE_MAX_ENTRIES', 10000))
+
+# SQL statements slower than this (milliseconds) are logged and counted on /metrics
+app.config['SLOW_QUERY_MS'] = float(os.getenv('SLOW_QUERY_MS', 200))
+
 # Set JSON output formatting
 app.json.compact = False
 
@@ -35,15 +98,36 @@ metadata = MetaData(naming_convention={
 db = SQLAlchemy(metadata=metadata)
 migrate = Migrate(app, db)
 bcrypt = Bcrypt(app)
+password_hasher = PasswordHasher(
+    rounds=app.config['BCRYPT_LOG_ROUNDS'],
+    pool_size=app.config['BCRYPT_POOL_SIZE'],
+    max_queue=app.config['BCRYPT_MAX_QUEUE'],
+)
+response_cache = ResponseCache(
+    make_backend(app.config['RESPONSE_CACHE_URL'], app.config['RESPONSE_CACHE_MAX_ENTRIES']),
+    ttl=app.config['RESPONSE_CACHE_TTL'],
+)
+session_store = make_session_store(app.config['SESSION_STORE_URL'])
+if session_store is not None:
+    app.session_interface = ServerSessionInterface(session_store)
+principal_cache = PrincipalCache(
+    ttl=app.config['PRINCIPAL_CACHE_TTL'],
+    max_entries=app.config['PRINCIPAL_CACHE_MAX_ENTRIES'],
+)
 api = Api(app)
 
 # Attach SQLAlchemy to Flask
 db.init_app(app)
 
+# Encode JSON responses with orjson when it's installed
+install_fast_json(app, api)
+
 #allow cross origin requests
 CORS(
     app, supports_credentials=True,
-    methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"], 
+    methods=["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"], 
     origins=["*"],
-    allow_headers=["Content-Type", "Authorization"],
+    allow_headers=["Content-Type", "Authorization", "Range", "If-None-Match", "If-Range"],
+    # Lets the cross-origin PDF viewer see that /pdf-proxy serves ranges
+    expose_headers=["Accept-Ranges", "Content-Range", "Content-Length", "ETag"],
         )
\ No newline at end of file
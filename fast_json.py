@@ -0,0 +1,40 @@
+from flask import current_app, make_response
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # Optional: fall back to the stdlib encoder
+    orjson = None
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """Flask JSON provider that encodes with orjson
+
+    Datetimes are passed through to Flask's default hook so jsonify output
+    stays exactly what it was with the stdlib encoder.
+    """
+
+    def dumps(self, obj, **kwargs):
+        option = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        if kwargs.get('sort_keys', self.sort_keys):
+            option |= orjson.OPT_SORT_KEYS
+        if kwargs.get('indent'):
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=self.default, option=option).decode('utf-8')
+
+
+def output_json(data, code, headers=None):
+    """Flask-RESTful representation for application/json using the app's provider"""
+    dumped = current_app.json.dumps(data, sort_keys=False) + "\n"
+    resp = make_response(dumped, code)
+    resp.headers.extend(headers or {})
+    return resp
+
+
+def install_fast_json(app, api):
+    if orjson is None:
+        return
+    compact = app.json.compact
+    app.json = OrjsonProvider(app)
+    app.json.compact = compact
+    api.representations['application/json'] = output_json
@@ -0,0 +1,153 @@
+import logging
+import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import cloudinary.uploader
+from PyPDF2 import PdfReader
+from sqlalchemy.exc import IntegrityError
+from config import app, db, response_cache
+from models import Book, UploadJob
+
+# PDF uploads are parsed and pushed to Cloudinary here, off the request thread
+ingest_executor = ThreadPoolExecutor(
+    max_workers=app.config['INGEST_WORKERS'],
+    thread_name_prefix='pdf-ingest',
+)
+
+
+def extract_pdf_metadata(pdf, filename):
+    # Extract title and author with fallbacks
+    metadata = pdf.metadata or {}
+    title = metadata.get("/Title", "")
+    if not title:
+        # Use filename as fallback
+        title = filename.replace(".pdf", "")
+
+    author = metadata.get("/Author", "Unknown")
+
+    return {
+        "title": title,
+        "author": author,
+        "page_count": len(pdf.pages)
+    }
+
+def extract_content_preview(pdf, max_pages=5, max_chars=10000):
+    """Extract text from the first few pages for search indexing"""
+    content = []
+
+    # Extract text from first few pages
+    for i in range(min(max_pages, len(pdf.pages))):
+        page = pdf.pages[i]
+        content.append(page.extract_text())
+
+        # Check if we've extracted enough text
+        if sum(len(text) for text in content) >= max_chars:
+            break
+
+    return " ".join(content)[:max_chars]
+
+
+def submit_upload(user_id, path, filename, sha256):
+    """Queue a staged PDF for ingestion and return its UploadJob
+
+    If a book with the same content hash already exists the job is completed
+    on the spot against that book, with no parse and no Cloudinary upload.
+    """
+    job = UploadJob(id=uuid.uuid4().hex, user_id=user_id, filename=filename, status='queued')
+    existing = Book.query.filter_by(content_sha256=sha256).first()
+    if existing:
+        job.status = 'done'
+        job.book_id = existing.id
+    db.session.add(job)
+    db.session.commit()
+
+    if existing:
+        os.remove(path)
+    else:
+        ingest_executor.submit(_run_job, job.id, path, filename, sha256)
+    return job
+
+
+def _set_status(job, status, **fields):
+    job.status = status
+    for key, value in fields.items():
+        setattr(job, key, value)
+    db.session.commit()
+
+
+def _discard_cloudinary_upload(public_id):
+    if not public_id:
+        return
+    try:
+        cloudinary.uploader.destroy(public_id, resource_type="raw")
+    except Exception:
+        logging.exception(f"Could not remove duplicate Cloudinary upload {public_id}")
+
+
+def _run_job(job_id, path, filename, sha256):
+    with app.app_context():
+        job = db.session.get(UploadJob, job_id)
+        public_id = None
+        try:
+            # An identical file may have been ingested while this one was queued
+            existing = Book.query.filter_by(content_sha256=sha256).first()
+            if existing:
+                _set_status(job, 'done', book_id=existing.id)
+                return
+
+            # Step 1: Parse the PDF once for both metadata and content preview
+            _set_status(job, 'parsing')
+            with open(path, 'rb') as pdf_file:
+                pdf = PdfReader(pdf_file)
+                metadata = extract_pdf_metadata(pdf, filename)
+                content_preview = extract_content_preview(pdf)
+
+            # Step 2: Upload PDF to Cloudinary with public access, one chunk in memory at a time
+            _set_status(job, 'uploading')
+            upload_result = cloudinary.uploader.upload_large(
+                path,
+                chunk_size=app.config['CLOUDINARY_UPLOAD_CHUNK_SIZE'],
+                resource_type="raw",
+                folder="pdf_books",
+                format="pdf",
+                type="upload",
+                access_mode="public",  # Make sure it's public
+                public_id=f"pdf_{job_id}",  # Unique per upload job
+            )
+            public_id = upload_result.get("public_id")
+
+            # Step 3: Save to Database
+            _set_status(job, 'saving')
+            book = Book(
+                title=metadata["title"],
+                author=metadata["author"],
+                page_count=metadata["page_count"],
+                pdf_url=upload_result["secure_url"],
+                is_pdf=True,
+                file_size=upload_result.get("bytes", 0),
+                content_preview=content_preview,
+                content_sha256=sha256,
+                upload_date=datetime.utcnow(),
+            )
+            db.session.add(book)
+            db.session.flush()
+            _set_status(job, 'done', book_id=book.id)
+            response_cache.invalidate("books")
+        except IntegrityError as e:
+            db.session.rollback()
+            existing = Book.query.filter_by(content_sha256=sha256).first()
+            if existing:
+                # Lost a race with a concurrent upload of the same file: keep theirs
+                _set_status(job, 'done', book_id=existing.id)
+                _discard_cloudinary_upload(public_id)
+            else:
+                logging.exception(f"PDF ingestion failed for job {job_id}")
+                _set_status(job, 'failed', error=str(e))
+        except Exception as e:
+            db.session.rollback()
+            logging.exception(f"PDF ingestion failed for job {job_id}")
+            _set_status(job, 'failed', error=str(e))
+        finally:
+            if os.path.exists(path):
+                os.remove(path)
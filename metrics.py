@@ -0,0 +1,197 @@
+import logging
+import threading
+import time
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Seconds; covers fast cached reads through slow uploads
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    escaped = (
+        (key, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for key, value in labels
+    )
+    return '{' + ','.join(f'{key}="{value}"' for key, value in escaped) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    type = 'counter'
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        # An unlabelled counter is reported as 0 before its first increment
+        self._values = {} if self.labels else {(): 0}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(label, '') for label in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        for key, value in sorted(values.items()):
+            yield self.name, tuple(zip(self.labels, key)), value
+
+
+class Histogram:
+    type = 'histogram'
+
+    def __init__(self, name, documentation, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+        self._values = {}  # label values -> [bucket counts..., sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(label, '') for label in self.labels)
+        with self._lock:
+            counts = self._values.get(key)
+            if counts is None:
+                counts = self._values[key] = [0] * len(self.buckets) + [0.0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            counts[-1] += value
+
+    def samples(self):
+        with self._lock:
+            values = {key: list(counts) for key, counts in self._values.items()}
+        for key, counts in sorted(values.items()):
+            labels = tuple(zip(self.labels, key))
+            for bound, count in zip(self.buckets, counts):
+                yield f'{self.name}_bucket', labels + (('le', _format_value(float(bound))),), count
+            yield f'{self.name}_sum', labels, counts[-1]
+            yield f'{self.name}_count', labels, counts[-2]
+
+
+class Gauge:
+    """A value read from a callback at scrape time"""
+    type = 'gauge'
+
+    def __init__(self, name, documentation, read, type='gauge'):
+        self.name = name
+        self.documentation = documentation
+        self.read = read
+        self.type = type
+
+    def samples(self):
+        yield self.name, (), self.read()
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format"""
+        lines = []
+        for metric in self._metrics:
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.type}')
+            for name, labels, value in metric.samples():
+                lines.append(f'{name}{_format_labels(labels)} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+REQUEST_LATENCY = registry.register(Histogram(
+    'http_request_duration_seconds', 'Time to handle a request', ('method', 'endpoint')))
+REQUESTS = registry.register(Counter(
+    'http_requests_total', 'Requests handled', ('method', 'endpoint', 'status')))
+REQUEST_SQL_STATEMENTS = registry.register(Histogram(
+    'http_request_sql_statements', 'SQL statements executed per request', ('endpoint',),
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100)))
+REQUEST_SQL_SECONDS = registry.register(Histogram(
+    'http_request_sql_duration_seconds', 'Time spent in SQL per request', ('endpoint',)))
+SQL_STATEMENTS = registry.register(Counter(
+    'sql_statements_total', 'SQL statements executed, inside and outside requests'))
+SLOW_QUERIES = registry.register(Counter(
+    'sql_slow_queries_total', 'SQL statements slower than SLOW_QUERY_MS'))
+CLOUDINARY_FETCH_SECONDS = registry.register(Histogram(
+    'cloudinary_fetch_duration_seconds', 'Time to download a PDF from Cloudinary', ('outcome',),
+    buckets=(0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)))
+CLOUDINARY_FETCH_BYTES = registry.register(Counter(
+    'cloudinary_fetch_bytes_total', 'PDF bytes downloaded from Cloudinary'))
+PDF_PROXY_BYTES = registry.register(Counter(
+    'pdf_proxy_bytes_sent_total', 'PDF bytes sent to clients by /pdf-proxy'))
+
+
+def request_endpoint():
+    # The URL rule, not the path, so /books/1 and /books/2 share a series
+    return request.url_rule.rule if request.url_rule is not None else 'unmatched'
+
+
+def _start_request():
+    g.request_started = time.perf_counter()
+    g.sql_statements = 0
+    g.sql_seconds = 0.0
+
+
+def _finish_request(response):
+    started = g.pop('request_started', None)
+    if started is None:
+        return response
+    endpoint = request_endpoint()
+    REQUEST_LATENCY.observe(time.perf_counter() - started, method=request.method, endpoint=endpoint)
+    REQUESTS.inc(method=request.method, endpoint=endpoint, status=response.status_code)
+    REQUEST_SQL_STATEMENTS.observe(g.sql_statements, endpoint=endpoint)
+    REQUEST_SQL_SECONDS.observe(g.sql_seconds, endpoint=endpoint)
+    return response
+
+
+def install_metrics(app):
+    """Time every request and SQL statement the app runs
+
+    The request hook is put ahead of any other before_request function so
+    requests they turn away are still measured. Metrics live in the process
+    that recorded them, so each gunicorn worker reports its own.
+    """
+    slow_query_seconds = app.config['SLOW_QUERY_MS'] / 1000
+    app.before_request_funcs.setdefault(None, []).insert(0, _start_request)
+    app.after_request(_finish_request)
+
+    @event.listens_for(Engine, 'before_cursor_execute')
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        # Some DDL and raw connection paths run without an execution context; those go untimed
+        if context is None:
+            return
+        context._metrics_started = time.perf_counter()
+
+    @event.listens_for(Engine, 'after_cursor_execute')
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if context is None:
+            return
+        elapsed = time.perf_counter() - context._metrics_started
+        SQL_STATEMENTS.inc()
+        in_request = has_request_context() and 'sql_statements' in g
+        if in_request:
+            g.sql_statements += 1
+            g.sql_seconds += elapsed
+        if elapsed >= slow_query_seconds:
+            SLOW_QUERIES.inc()
+            endpoint = request_endpoint() if in_request else '-'
+            logging.warning(
+                f"slow_query duration_ms={elapsed * 1000:.1f} endpoint={endpoint} statement={' '.join(statement.split())[:1000]!r}"
+            )
@@ -1,15 +1,16 @@
 from sqlalchemy.orm import validates
 from sqlalchemy.ext.hybrid import hybrid_property
 from sqlalchemy_serializer import SerializerMixin
-from sqlalchemy import ForeignKey
+from serializers import CompiledSerializerMixin
+from sqlalchemy import ForeignKey, event, or_
 import re
-from config import db, bcrypt
-from sqlalchemy import Text, text
-from sqlalchemy.dialects.postgresql import TSVECTOR
+from config import db, password_hasher, principal_cache, session_store
+from sqlalchemy import Text
+from sqlalchemy.dialects.postgresql import TSVECTOR, insert as pg_insert
 from sqlalchemy import func, Column, Integer, String, Boolean, Text, DateTime
-from datetime import datetime
+from datetime import datetime, timedelta
 
-class User(db.Model, SerializerMixin):
+class User(CompiledSerializerMixin, db.Model, SerializerMixin):
     __tablename__ = 'users'
 
     id = db.Column(db.Integer, primary_key=True)
@@ -17,9 +18,9 @@ class User(db.Model, SerializerMixin):
     password_hash = db.Column(db.String(255), nullable=False)
     serialize_only = ("id","username","reading_lists","reviews")
 
-    #relationship
-    reviews = db.relationship('Review', back_populates='user',lazy='dynamic')
-    reading_lists = db.relationship('ReadingList', back_populates='user', lazy='dynamic')
+    #relationship (plain lazy lists, so endpoints can eager-load them with selectinload)
+    reviews = db.relationship('Review', back_populates='user')
+    reading_lists = db.relationship('ReadingList', back_populates='user')
 
     # SerializerMixin Rules
     serialize_rules =("-password_hash","-reviews.user","-reading_lists.user")
@@ -34,10 +35,24 @@ class User(db.Model, SerializerMixin):
         if not re.match("^[A-Za-z0-9_]+$", username): #restrict to alphanumeric + underscores
             raise ValueError("Username can only contain letters,numbers and underscores")
         return username
+    # Hashing runs on the password_hasher process pool, off the request thread
     def set_password(self, password):
-        self.password_hash = bcrypt.generate_password_hash(password).decode('utf-8')
+        self.password_hash = password_hasher.hash(password)
     def check_password(self, password):
-        return bcrypt.check_password_hash(self.password_hash, password)
+        return password_hasher.check(self.password_hash, password)
+    def password_needs_rehash(self):
+        return password_hasher.needs_rehash(self.password_hash)
+
+# Cached principals must not outlive a change to the user row; a deleted user's sessions go with it
+@event.listens_for(User, 'after_update')
+def user_after_update(mapper, connection, target):
+    principal_cache.invalidate(target.id)
+
+@event.listens_for(User, 'after_delete')
+def user_after_delete(mapper, connection, target):
+    principal_cache.invalidate(target.id)
+    if session_store is not None:
+        session_store.delete_user(target.id)
 
 #book model
 class Book(db.Model, SerializerMixin):
@@ -57,9 +72,40 @@ class Book(db.Model, SerializerMixin):
     file_size = db.Column(db.Integer)  # Size in bytes
     upload_date = db.Column(db.DateTime, default=datetime.utcnow)
     content_preview = db.Column(db.Text)  # First few pages of content for search
+    content_sha256 = db.Column(db.String(64), unique=True)  # Hash of the uploaded PDF, for deduplication
+    # Review aggregates, kept in step by adjust_ratings() in the same transaction as the review change
+    review_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    rating_sum = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    avg_rating = db.Column(db.Float)  # NULL until the first review
     serialize_only = ("id","title","author","genre","description","page_count","image_url","publication_year","reviews","reading_list_books", "pdf_url", "is_pdf")
 
-    
+    # Public field name -> column attribute, in the order to_dict emits them
+    api_fields = {
+        'id': 'id',
+        'title': 'title',
+        'author': 'author',
+        'description': 'description',
+        'cover_url': 'image_url',
+        'pdf_url': 'pdf_url',
+        'is_pdf': 'is_pdf',
+        'page_count': 'page_count',
+        'file_size': 'file_size',
+        'upload_date': 'upload_date',
+        'review_count': 'review_count',
+        'avg_rating': 'avg_rating',
+    }
+
+    @classmethod
+    def row_to_dict(cls, row, fields):
+        """Build the to_dict shape for a column-projected row, limited to fields"""
+        result = {}
+        for field in fields:
+            value = getattr(row, cls.api_fields[field])
+            if field == 'upload_date':
+                value = value.isoformat() if value else None
+            result[field] = value
+        return result
+
     def to_dict(self):
         return {
             'id': self.id,
@@ -71,46 +117,150 @@ class Book(db.Model, SerializerMixin):
             'is_pdf': self.is_pdf,
             'page_count': self.page_count,
             'file_size': self.file_size,
-            'upload_date': self.upload_date.isoformat() if self.upload_date else None
+            'upload_date': self.upload_date.isoformat() if self.upload_date else None,
+            'review_count': self.review_count,
+            'avg_rating': self.avg_rating,
         }
-    # Add this method to update search_vector
+
+    @classmethod
+    def adjust_ratings(cls, book_id, count_delta, sum_delta):
+        """Apply a review change to a book's aggregates in one UPDATE; does not commit
+
+        The new values are computed from the row's current ones by the
+        database, so concurrent reviews of the same book can't lose updates.
+        """
+        new_count = cls.review_count + count_delta
+        new_sum = cls.rating_sum + sum_delta
+        db.session.execute(
+            db.update(cls).where(cls.id == book_id).values(
+                review_count=new_count,
+                rating_sum=new_sum,
+                avg_rating=db.cast(new_sum, db.Float) / func.nullif(new_count, 0),
+            ).execution_options(synchronize_session=False)
+        )
+
     @classmethod
-    def update_search_vector(cls):
-        db.session.execute(text("""
-            UPDATE books
-            SET search_vector = to_tsvector('english', 
-                COALESCE(title, '') || ' ' || 
-                COALESCE(author, '') || ' ' || 
-                COALESCE(description, '') || ' ' || 
-                COALESCE(content_preview, '')
-            )
-        """))  # Added closing parenthesis here
+    def reconcile_ratings(cls):
+        """Recompute every book's aggregates from its reviews; returns how many had drifted"""
+        stats = db.select(
+            Review.book_id,
+            func.count(Review.id).label('review_count'),
+            func.sum(Review.rating).label('rating_sum'),
+        ).group_by(Review.book_id).subquery()
+        # One pass over reviews for books that have some, then reset the ones that have none left
+        reviewed = db.session.execute(
+            db.update(cls).where(
+                cls.id == stats.c.book_id,
+                or_(cls.review_count != stats.c.review_count, cls.rating_sum != stats.c.rating_sum),
+            ).values(
+                review_count=stats.c.review_count,
+                rating_sum=stats.c.rating_sum,
+                avg_rating=db.cast(stats.c.rating_sum, db.Float) / stats.c.review_count,
+            ).execution_options(synchronize_session=False)
+        )
+        unreviewed = db.session.execute(
+            db.update(cls).where(
+                cls.review_count != 0,
+                ~db.exists().where(Review.book_id == cls.id),
+            ).values(review_count=0, rating_sum=0, avg_rating=None)
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+        return reviewed.rowcount + unreviewed.rowcount
+
+    # Rebuild search_vector set-wise, for rows written outside the ORM hooks below
+    @classmethod
+    def update_search_vector(cls, ids=None):
+        """Refresh search_vector for the given ids, or for rows that have none yet"""
+        stmt = db.update(cls).values(search_vector=search_vector_expression(
+            cls.title, cls.author, cls.description, cls.content_preview
+        ))
+        if ids is not None:
+            stmt = stmt.where(cls.id.in_(ids))
+        else:
+            stmt = stmt.where(cls.search_vector.is_(None))
+        db.session.execute(stmt, execution_options={"synchronize_session": False})
         db.session.commit()
     @validates('title', 'author', 'genre')
     def validate_book_fields(self, key, value):
+        return self.check_book_field(key, value)
+    
+    @validates('page_count', 'publication_year')
+    def validate_numeric_fields(self, key, value):
+        return self.check_numeric_field(key, value)
+
+    # Shared with the bulk importer, which writes through Core and so skips @validates
+    @staticmethod
+    def check_book_field(key, value):
         if not value or len(value.strip()) == 0:
             raise ValueError(f"{key.capitalize()} cannot be empty.")
         if key == 'genre' and len(value) > 100:
             raise ValueError("Genre must be less than 100 characters.")
         return value
-    
-    @validates('page_count', 'publication_year')
-    def validate_numeric_fields(self, key, value):
+
+    @staticmethod
+    def check_numeric_field(key, value):
         if key == 'page_count' and (not isinstance(value, int) or value <= 0):
             raise ValueError("Page count must be a positive integer.")
         if key == 'publication_year' and (not isinstance(value, int) or value < 0):
             raise ValueError("Publication year must be a non-negative integer.")
         return value
 
-    #relationship
-    reviews=db.relationship('Review', back_populates='book',lazy='dynamic')
-    reading_list_books= db.relationship('ReadingListBook', back_populates='book')
+    # Remove books set-wise; ON DELETE CASCADE takes their reviews, list entries, progress and reports with them
+    @classmethod
+    def delete_where(cls, *criteria):
+        """Delete every book matching criteria in one statement and return the deleted ids"""
+        stmt = db.delete(cls).where(*criteria).returning(cls.id)
+        ids = db.session.execute(stmt, execution_options={"synchronize_session": False}).scalars().all()
+        db.session.commit()
+        return ids
+
+    #relationship (passive_deletes leaves dependent rows to the database's ON DELETE CASCADE)
+    reviews=db.relationship('Review', back_populates='book', passive_deletes=True)
+    reading_list_books= db.relationship('ReadingListBook', back_populates='book', passive_deletes=True)
 
     #SerializerMixin Rules
     serialize_rules=("-reviews.book","-reading_list_books.book")
 
+# Keyset pagination on /books?sort=upload_date walks this index newest-first
+db.Index('ix_books_upload_date_id', Book.upload_date.desc().nulls_last(), Book.id.desc())
+db.Index('ix_books_search_vector', Book.search_vector, postgresql_using='gin')
+db.Index('ix_books_avg_rating_id', Book.avg_rating.desc().nulls_last(), Book.id.desc())
+
+# Columns that feed search_vector, with their ts_rank weights
+SEARCH_VECTOR_FIELDS = (
+    ('title', 'A'),
+    ('author', 'B'),
+    ('description', 'C'),
+    ('content_preview', 'D'),
+)
+
+def search_vector_expression(*sources):
+    """Weighted tsvector over title, author, description and content_preview"""
+    vector = None
+    for source, (_, weight) in zip(sources, SEARCH_VECTOR_FIELDS):
+        part = func.setweight(func.to_tsvector('english', func.coalesce(source, '')), weight)
+        vector = part if vector is None else vector.op('||', return_type=TSVECTOR)(part)
+    return vector
+
+def _set_search_vector(target):
+    target.search_vector = search_vector_expression(
+        *(getattr(target, field) for field, _ in SEARCH_VECTOR_FIELDS)
+    )
+
+@event.listens_for(Book, 'before_insert')
+def book_before_insert(mapper, connection, target):
+    _set_search_vector(target)
+
+@event.listens_for(Book, 'before_update')
+def book_before_update(mapper, connection, target):
+    # Only touch the vector when one of its source columns changed
+    state = db.inspect(target)
+    if any(state.attrs[field].history.has_changes() for field, _ in SEARCH_VECTOR_FIELDS):
+        _set_search_vector(target)
+
 #Reading List model
-class ReadingList(db.Model, SerializerMixin):
+class ReadingList(CompiledSerializerMixin, db.Model, SerializerMixin):
     __tablename__ = 'reading_lists'
 
     id= db.Column(db.Integer, primary_key=True)
@@ -130,18 +280,22 @@ class ReadingList(db.Model, SerializerMixin):
 
     #relationship
     user = db.relationship('User', back_populates='reading_lists')
-    books = db.relationship('ReadingListBook', back_populates='reading_list', lazy='joined')
+    # Loaded per endpoint (see READING_LIST_VIEWS in app.py) rather than always joined
+    books = db.relationship('ReadingListBook', back_populates='reading_list')
 
     # Serializer rules
     serialize_rules=("-user.reading_lists", "-books.reading_list")
 
 #Reading List book model
-class ReadingListBook(db.Model, SerializerMixin):
+class ReadingListBook(CompiledSerializerMixin, db.Model, SerializerMixin):
     __tablename__ = 'reading_list_books'
+    __table_args__ = (
+        db.UniqueConstraint('reading_list_id', 'book_id', name='uq_reading_list_books_list_book'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     reading_list_id = db.Column(db.Integer, ForeignKey('reading_lists.id'), nullable=False)
-    book_id = db.Column(db.Integer, ForeignKey('books.id'), nullable=False)
+    book_id = db.Column(db.Integer, ForeignKey('books.id', ondelete='CASCADE'), nullable=False)
     note = db.Column(db.Text)
     rating = db.Column(db.Integer)
 
@@ -166,12 +320,15 @@ class ReadingListBook(db.Model, SerializerMixin):
     serialize_rules = ("-reading_list.books", "-book.reading_list_books")
 
 #review Model
-class Review(db.Model, SerializerMixin):
+class Review(CompiledSerializerMixin, db.Model, SerializerMixin):
     __tablename__ = 'reviews'
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'book_id', name='uq_reviews_user_book'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, ForeignKey('users.id'), nullable=False)
-    book_id = db.Column(db.Integer, ForeignKey('books.id'), nullable=False)
+    book_id = db.Column(db.Integer, ForeignKey('books.id', ondelete='CASCADE'), nullable=False)
     review_text = db.Column(db.Text, nullable=False)
     rating = db.Column(db.Integer, nullable=False)
     created_at = db.Column(db.DateTime, server_default=db.func.now())
@@ -191,6 +348,24 @@ class Review(db.Model, SerializerMixin):
             raise ValueError("Rating must be an integer between 1 and 5.")
         return rating
 
+    # Clears the way for uq_reviews_user_book on databases that predate it
+    @classmethod
+    def delete_duplicates(cls):
+        """Keep each user's newest review of a book and delete the rest; returns how many went"""
+        ranked = db.select(
+            cls.id,
+            func.row_number().over(
+                partition_by=(cls.user_id, cls.book_id),
+                order_by=(cls.created_at.desc().nulls_last(), cls.id.desc()),
+            ).label('rank'),
+        ).subquery()
+        result = db.session.execute(
+            db.delete(cls).where(cls.id.in_(db.select(ranked.c.id).where(ranked.c.rank > 1)))
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+        return result.rowcount
+
     #relationship
     user = db.relationship('User',back_populates='reviews')
     book = db.relationship('Book', back_populates='reviews')
@@ -198,19 +373,46 @@ class Review(db.Model, SerializerMixin):
     serialize_rules = ("-user.reviews", "-book.reviews")
     # Add these models to your models.py file
 
+# Review feeds, newest first: all reviews, one book's and one user's
+db.Index('ix_reviews_created_at_id', Review.created_at.desc().nulls_last(), Review.id.desc())
+db.Index('ix_reviews_book_created_at_id', Review.book_id, Review.created_at.desc().nulls_last(), Review.id.desc())
+db.Index('ix_reviews_user_created_at_id', Review.user_id, Review.created_at.desc().nulls_last(), Review.id.desc())
+
+
 class ReadingProgress(db.Model, SerializerMixin):
     __tablename__ = 'reading_progress'
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'book_id', name='uq_reading_progress_user_book'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, ForeignKey('users.id'), nullable=False)
-    book_id = db.Column(db.Integer, ForeignKey('books.id'), nullable=False)
+    book_id = db.Column(db.Integer, ForeignKey('books.id', ondelete='CASCADE'), nullable=False)
     current_page = db.Column(db.Integer, default=1)
     percentage = db.Column(db.Integer, default=0)  # 0-100
     last_read = db.Column(db.DateTime, default=datetime.utcnow)
-    
+
+    # Clears the way for uq_reading_progress_user_book on databases that predate it
+    @classmethod
+    def delete_duplicates(cls):
+        """Keep the most recently read row per user and book and delete the rest; returns how many went"""
+        ranked = db.select(
+            cls.id,
+            func.row_number().over(
+                partition_by=(cls.user_id, cls.book_id),
+                order_by=(cls.last_read.desc().nulls_last(), cls.id.desc()),
+            ).label('rank'),
+        ).subquery()
+        result = db.session.execute(
+            db.delete(cls).where(cls.id.in_(db.select(ranked.c.id).where(ranked.c.rank > 1)))
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+        return result.rowcount
+
     # Relationships
     user = db.relationship('User', backref=db.backref('reading_progress', lazy='dynamic'))
-    book = db.relationship('Book', backref=db.backref('reading_progress', lazy='dynamic'))
+    book = db.relationship('Book', backref=db.backref('reading_progress', lazy='dynamic', passive_deletes=True))
     
     # SerializerMixin rules
     serialize_only = ("id", "user_id", "book_id", "current_page", "percentage", "last_read")
@@ -218,31 +420,74 @@ class ReadingProgress(db.Model, SerializerMixin):
     
     @validates('current_page')
     def validate_current_page(self, key, page):
-        if not isinstance(page, int) or page < 1:
-            raise ValueError("Current page must be a positive integer")
-        return page
+        return self.check_current_page(page)
     
     @validates('percentage')
     def validate_percentage(self, key, percentage):
+        return self.check_percentage(percentage)
+
+    # Shared with upsert(), which writes through Core and so skips @validates
+    @staticmethod
+    def check_current_page(page):
+        if not isinstance(page, int) or page < 1:
+            raise ValueError("Current page must be a positive integer")
+        return page
+
+    @staticmethod
+    def check_percentage(percentage):
         if not isinstance(percentage, int) or percentage < 0 or percentage > 100:
             raise ValueError("Percentage must be an integer between 0 and 100")
         return percentage
 
+    @classmethod
+    def upsert(cls, rows):
+        """Insert or update progress rows in one statement, keyed on (user_id, book_id)
+
+        rows are dicts with user_id, book_id, current_page, percentage and
+        last_read. A row never overwrites progress that was read more recently,
+        so out-of-order flushes from different workers can't move a reader back.
+        Does not commit.
+        """
+        stmt = pg_insert(cls)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[cls.user_id, cls.book_id],
+            set_={
+                'current_page': stmt.excluded.current_page,
+                'percentage': stmt.excluded.percentage,
+                'last_read': stmt.excluded.last_read,
+            },
+            where=or_(cls.last_read.is_(None), cls.last_read <= stmt.excluded.last_read),
+        )
+        # Postgres refuses to update the same row twice in one INSERT, so keep the latest per key
+        latest = {}
+        for row in rows:
+            key = (row['user_id'], row['book_id'])
+            if key not in latest or latest[key]['last_read'] <= row['last_read']:
+                latest[key] = row
+        if latest:
+            db.session.execute(stmt, list(latest.values()))
+
+
+# Backs the "continue reading" shelf: a user's progress, most recently read first
+db.Index('ix_reading_progress_user_last_read', ReadingProgress.user_id, ReadingProgress.last_read.desc())
+
 
 class ContentReport(db.Model, SerializerMixin):
     __tablename__ = 'content_reports'
-    
+
+    STATUSES = ('pending', 'reviewed', 'resolved')
+
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, ForeignKey('users.id'), nullable=False)
-    book_id = db.Column(db.Integer, ForeignKey('books.id'), nullable=False)
+    book_id = db.Column(db.Integer, ForeignKey('books.id', ondelete='CASCADE'), nullable=False)
     reason = db.Column(db.String(100), nullable=False)
     details = db.Column(db.Text)
     report_date = db.Column(db.DateTime, default=datetime.utcnow)
-    status = db.Column(db.String(20), default='pending')  # pending, reviewed, resolved
+    status = db.Column(db.String(20), default='pending')  # one of STATUSES
     
     # Relationships
     user = db.relationship('User', backref=db.backref('content_reports', lazy='dynamic'))
-    book = db.relationship('Book', backref=db.backref('content_reports', lazy='dynamic'))
+    book = db.relationship('Book', backref=db.backref('content_reports', lazy='dynamic', passive_deletes=True))
     
     # SerializerMixin rules
     serialize_only = ("id", "user_id", "book_id", "reason", "details", "report_date", "status")
@@ -258,7 +503,103 @@ class ContentReport(db.Model, SerializerMixin):
     
     @validates('status')
     def validate_status(self, key, status):
-        valid_statuses = ['pending', 'reviewed', 'resolved']
-        if status not in valid_statuses:
-            raise ValueError(f"Status must be one of: {', '.join(valid_statuses)}")
+        if status not in self.STATUSES:
+            raise ValueError(f"Status must be one of: {', '.join(self.STATUSES)}")
         return status
+
+
+class UploadJob(db.Model, SerializerMixin):
+    __tablename__ = 'upload_jobs'
+
+    # Stages a PDF upload moves through, with the progress reported for each
+    STAGES = {
+        'queued': 0,
+        'parsing': 10,
+        'uploading': 40,
+        'saving': 90,
+        'done': 100,
+        'failed': 100,
+    }
+
+    id = db.Column(db.String(32), primary_key=True)  # uuid4 hex
+    user_id = db.Column(db.Integer, ForeignKey('users.id'), nullable=False)
+    filename = db.Column(db.String(255))
+    status = db.Column(db.String(20), nullable=False, default='queued')
+    error = db.Column(db.Text)
+    book_id = db.Column(db.Integer, ForeignKey('books.id', ondelete='SET NULL'))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    # Relationships
+    user = db.relationship('User', backref=db.backref('upload_jobs', lazy='dynamic'))
+    book = db.relationship('Book')
+
+    serialize_only = ("id", "status", "error", "book_id", "created_at", "updated_at")
+
+    @validates('status')
+    def validate_status(self, key, status):
+        if status not in self.STAGES:
+            raise ValueError(f"Status must be one of: {', '.join(self.STAGES)}")
+        return status
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'filename': self.filename,
+            'status': self.status,
+            'progress': self.STAGES[self.status],
+            'error': self.error,
+            'book': self.book.to_dict() if self.book else None,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
+        }
+
+
+class ChunkedUpload(db.Model, SerializerMixin):
+    __tablename__ = 'chunked_uploads'
+    __table_args__ = (
+        # purge-chunked-uploads finds expired uploads through this
+        db.Index('ix_chunked_uploads_expires_at', 'expires_at'),
+    )
+
+    # Bytes received so far live on disk; the staged file's size is the upload offset
+    id = db.Column(db.String(32), primary_key=True)  # uuid4 hex
+    user_id = db.Column(db.Integer, ForeignKey('users.id'), nullable=False)
+    filename = db.Column(db.String(255), nullable=False)
+    total_size = db.Column(db.BigInteger, nullable=False)
+    sha256 = db.Column(db.String(64))  # Optional whole-file checksum, verified on completion
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Pushed back by every chunk; rows that predate the column count as expired
+    expires_at = db.Column(db.DateTime, nullable=False, server_default=db.func.now())
+
+    # Relationships
+    user = db.relationship('User', backref=db.backref('chunked_uploads', lazy='dynamic'))
+
+    def extend(self, ttl):
+        self.expires_at = datetime.utcnow() + timedelta(seconds=ttl)
+
+    @property
+    def expired(self):
+        return self.expires_at <= datetime.utcnow()
+
+    serialize_only = ("id", "filename", "total_size", "sha256", "created_at")
+
+    @validates('filename')
+    def validate_filename(self, key, filename):
+        if not filename or len(filename.strip()) == 0:
+            raise ValueError("Filename cannot be empty.")
+        if len(filename) > 255:
+            raise ValueError("Filename must be less than 255 characters.")
+        return filename
+
+    @validates('total_size')
+    def validate_total_size(self, key, total_size):
+        if not isinstance(total_size, int) or total_size <= 0:
+            raise ValueError("Size must be a positive integer.")
+        return total_size
+
+    @validates('sha256')
+    def validate_sha256(self, key, sha256):
+        if sha256 is not None and not re.match("^[0-9a-f]{64}$", sha256):
+            raise ValueError("sha256 must be a hex-encoded SHA-256 digest.")
+        return sha256
@@ -0,0 +1,59 @@
+import base64
+import json
+from datetime import datetime
+from sqlalchemy import and_, or_
+
+# Limits shared by the paginated list endpoints
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+def parse_limit(raw, default=DEFAULT_PAGE_SIZE, maximum=MAX_PAGE_SIZE):
+    """Parse a ?limit= value, capping it at maximum"""
+    if raw is None or raw == '':
+        return default
+    try:
+        limit = int(raw)
+    except (TypeError, ValueError):
+        raise ValueError("Limit must be a positive integer.")
+    if limit < 1:
+        raise ValueError("Limit must be a positive integer.")
+    return min(limit, maximum)
+
+
+def encode_cursor(*values):
+    """Pack the sort key of the last row on a page into an opaque token"""
+    payload = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    raw = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token, *types):
+    """Unpack a token from encode_cursor, converting each value to the given type"""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        if not isinstance(values, list) or len(values) != len(types):
+            raise ValueError
+        decoded = []
+        for value, kind in zip(values, types):
+            if value is None:
+                decoded.append(None)
+            elif kind is datetime:
+                decoded.append(datetime.fromisoformat(value))
+            else:
+                decoded.append(kind(value))
+        return decoded
+    except (ValueError, TypeError, UnicodeError, json.JSONDecodeError):
+        raise ValueError("Invalid cursor.")
+
+
+def keyset_after(sort_column, id_column, last_value, last_id):
+    """Filter for the rows after (last_value, last_id) in ORDER BY sort_column DESC NULLS LAST, id DESC"""
+    if last_value is None:
+        return and_(sort_column.is_(None), id_column < last_id)
+    return or_(
+        sort_column < last_value,
+        and_(sort_column == last_value, id_column < last_id),
+        sort_column.is_(None),
+    )
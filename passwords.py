@@ -0,0 +1,84 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+import bcrypt
+
+
+class PasswordHashBusy(Exception):
+    """Too many password hashes are already waiting for the pool"""
+
+
+# Run inside the pool's worker processes; kept at module level so they pickle
+def _hash_password(password, rounds):
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds)).decode('utf-8')
+
+def _check_password(password_hash, password):
+    try:
+        return bcrypt.checkpw(password.encode('utf-8'), password_hash.encode('utf-8'))
+    except ValueError:  # Not a bcrypt hash
+        return False
+
+
+class PasswordHasher:
+    """bcrypt hashing on a bounded process pool
+
+    bcrypt is deliberately slow and holds the GIL, so running it on request
+    threads lets a login burst stall every other endpoint in the worker.
+    Here it runs in pool_size separate processes, and once max_queue hashes
+    are in flight further callers get PasswordHashBusy instead of piling up.
+    A pool_size of 0 hashes inline, which is handy for scripts like seed.py.
+    Hashes are compatible with Flask-Bcrypt's.
+    """
+
+    def __init__(self, rounds=12, pool_size=2, max_queue=64):
+        self.rounds = rounds
+        self.pool_size = pool_size
+        self.max_queue = max_queue
+        self._pool = None
+        self._pid = None
+        self._depth = 0
+        self._lock = threading.Lock()
+
+    @property
+    def queue_depth(self):
+        """Hashes submitted and not yet finished in this process"""
+        return self._depth
+
+    def hash(self, password):
+        return self._run(_hash_password, password, self.rounds)
+
+    def check(self, password_hash, password):
+        return self._run(_check_password, password_hash, password)
+
+    def needs_rehash(self, password_hash):
+        """True when a hash was made with a lower work factor than configured"""
+        try:
+            return int(password_hash.split('$')[2]) < self.rounds
+        except (IndexError, ValueError):
+            return True
+
+    def _executor(self):
+        # A pool inherited across a fork belongs to the parent, so build our own
+        if self._pool is None or self._pid != os.getpid():
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.pool_size,
+                mp_context=multiprocessing.get_context('spawn'),
+            )
+            self._pid = os.getpid()
+        return self._pool
+
+    def _run(self, fn, *args):
+        if self.pool_size == 0:
+            return fn(*args)
+
+        with self._lock:
+            if self._depth >= self.max_queue:
+                raise PasswordHashBusy()
+            self._depth += 1
+            executor = self._executor()
+        try:
+            return executor.submit(fn, *args).result()
+        finally:
+            with self._lock:
+                self._depth -= 1
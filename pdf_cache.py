@@ -0,0 +1,115 @@
+import hashlib
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows dev machines: fall back to per-process locks
+    fcntl = None
+
+
+class PdfCache:
+    """Size-bounded on-disk cache of proxied PDFs
+
+    Entries are keyed by book id plus a content version (a hash of the
+    Cloudinary URL, which changes whenever the file is re-uploaded), so a
+    stale copy is never served. Hits bump the file's mtime and eviction
+    removes the least recently used files once the directory grows past
+    max_bytes. Fills are single-flight: concurrent misses for the same entry,
+    across threads and gunicorn workers, wait for one download instead of
+    each going to the origin.
+    """
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def version_for(url):
+        return hashlib.sha1(url.encode('utf-8')).hexdigest()[:16]
+
+    @staticmethod
+    def key_for(book_id, version):
+        return f"{book_id}-{version}"
+
+    def path_for(self, key):
+        return os.path.join(self.directory, f"{key}.pdf")
+
+    def get(self, key, fill):
+        """Return the cached path for key, calling fill(fileobj) to download it on a miss"""
+        path = self.path_for(key)
+        if self._touch(path):
+            return path
+
+        with self._key_lock(key):
+            # Someone else may have filled it while we waited
+            if self._touch(path):
+                return path
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.part')
+            try:
+                with os.fdopen(fd, 'wb') as tmp:
+                    fill(tmp)
+                os.replace(tmp_path, path)
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+
+        self._evict(keep=path)
+        return path
+
+    def _touch(self, path):
+        try:
+            os.utime(path)
+            return True
+        except FileNotFoundError:
+            return False
+
+    @contextmanager
+    def _key_lock(self, key):
+        with self._locks_guard:
+            thread_lock = self._locks.setdefault(key, threading.Lock())
+        with thread_lock:
+            if fcntl is None:
+                yield
+                return
+            with open(os.path.join(self.directory, f"{key}.lock"), 'wb') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _evict(self, keep=None):
+        """Drop least recently used PDFs until the cache fits in max_bytes"""
+        entries = []
+        total = 0
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if not entry.name.endswith('.pdf'):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                # Readers that already opened the file keep their handle
+                os.remove(path)
+                total -= size
+                os.remove(path[:-len('.pdf')] + '.lock')
+            except FileNotFoundError:
+                pass
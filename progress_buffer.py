@@ -0,0 +1,119 @@
+import atexit
+import logging
+import os
+import threading
+import time
+from sqlalchemy.exc import IntegrityError
+from config import db
+from models import ReadingProgress
+
+
+class ProgressBuffer:
+    """Coalesces reading-progress writes in memory and flushes them in batches
+
+    Readers report progress on nearly every page turn, but only the latest
+    position per (user_id, book_id) matters. Updates are kept here keyed that
+    way and a background thread writes everything pending as one batched
+    upsert every interval seconds; whatever is left is flushed when the
+    process exits. Each worker process has its own buffer, so a read served
+    by a different worker can lag by up to one interval.
+    """
+
+    def __init__(self, app, interval):
+        self.app = app
+        self.interval = interval
+        self._pending = {}
+        self._flushing = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pid = None
+        atexit.register(self.flush)
+
+    def add(self, user_id, book_id, current_page, percentage, last_read):
+        row = {
+            'user_id': user_id,
+            'book_id': book_id,
+            'current_page': current_page,
+            'percentage': percentage,
+            'last_read': last_read,
+        }
+        with self._lock:
+            self._pending[(user_id, book_id)] = row
+            self._ensure_thread()
+
+    def get(self, user_id, book_id):
+        """The buffered row for (user_id, book_id), or None if nothing is waiting"""
+        key = (user_id, book_id)
+        with self._lock:
+            return self._pending.get(key) or self._flushing.get(key)
+
+    def pending_count(self):
+        with self._lock:
+            return len(self._pending)
+
+    def for_user(self, user_id):
+        """Every buffered row for user_id, keyed by book_id"""
+        with self._lock:
+            rows = {**self._flushing, **self._pending}
+        return {book_id: row for (uid, book_id), row in rows.items() if uid == user_id}
+
+    def flush(self):
+        """Write everything pending now; returns the number of rows written"""
+        with self._flush_lock:
+            with self._lock:
+                self._flushing, self._pending = self._pending, {}
+            rows = list(self._flushing.values())
+            try:
+                if rows:
+                    with self.app.app_context():
+                        return self._write(rows)
+                return 0
+            finally:
+                with self._lock:
+                    self._flushing = {}
+
+    def _write(self, rows):
+        try:
+            ReadingProgress.upsert(rows)
+            db.session.commit()
+            return len(rows)
+        except IntegrityError:
+            # Usually a book deleted (or never existing) since the update was
+            # buffered; write rows one by one so only the bad ones are dropped
+            db.session.rollback()
+        except Exception:
+            db.session.rollback()
+            logging.exception(f"Could not flush {len(rows)} reading progress updates; will retry")
+            self._requeue(rows)
+            return 0
+
+        written = 0
+        for row in rows:
+            try:
+                ReadingProgress.upsert([row])
+                db.session.commit()
+                written += 1
+            except IntegrityError:
+                db.session.rollback()
+                logging.warning(f"Dropping reading progress for user {row['user_id']}, book {row['book_id']}")
+        return written
+
+    def _requeue(self, rows):
+        with self._lock:
+            for row in rows:
+                # Anything buffered since is newer, so it wins
+                self._pending.setdefault((row['user_id'], row['book_id']), row)
+
+    def _ensure_thread(self):
+        # Threads don't survive a fork, so each worker process starts its own
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            threading.Thread(target=self._run, name='progress-flush', daemon=True).start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.flush()
+            except Exception:
+                logging.exception("Reading progress flush failed")
@@ -0,0 +1,198 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from urllib.parse import urlencode
+from flask import Response, request
+
+try:
+    import redis
+except ImportError:  # Optional: only needed for RESPONSE_CACHE_URL
+    redis = None
+
+# Bumped by clear(); part of every entry, so it invalidates everything at once
+GLOBAL_TAG = '*'
+
+
+class MemoryBackend:
+    """LRU of cache entries with per-entry expiry, plus tag generations, in this process"""
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._generations = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            value, expires_at = item
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def generations(self, tags):
+        with self._lock:
+            return [self._generations.get(tag, 0) for tag in tags]
+
+    def bump(self, tags):
+        with self._lock:
+            for tag in tags:
+                self._generations[tag] = self._generations.get(tag, 0) + 1
+
+
+class RedisBackend:
+    """Entries and tag generations in a Redis-compatible server, shared by every worker"""
+
+    def __init__(self, url, prefix='book_app:cache:'):
+        if redis is None:
+            raise RuntimeError("RESPONSE_CACHE_URL is set but the redis package is not installed")
+        self._client = redis.Redis.from_url(url)
+        self._prefix = prefix
+
+    def get(self, key):
+        return self._client.get(self._prefix + key)
+
+    def set(self, key, value, ttl):
+        self._client.set(self._prefix + key, value, ex=max(1, int(ttl)))
+
+    def generations(self, tags):
+        values = self._client.mget([self._prefix + 'gen:' + tag for tag in tags])
+        return [int(value) if value is not None else 0 for value in values]
+
+    def bump(self, tags):
+        pipe = self._client.pipeline()
+        for tag in tags:
+            pipe.incr(self._prefix + 'gen:' + tag)
+        pipe.execute()
+
+
+class ResponseCache:
+    """Cache of serialized JSON responses, invalidated by tag
+
+    Each entry remembers the generation of every tag it was built from;
+    writers bump the tags they touch, and an entry whose tags have moved on
+    is treated as a miss. Entries carry a strong ETag so clients can
+    revalidate with If-None-Match and get a 304. With the in-process backend
+    each worker has its own cache, so another worker's writes only reach it
+    through the TTL; the Redis backend shares entries and tags between them.
+    """
+
+    def __init__(self, backend=None, ttl=60):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.backend is not None and self.ttl > 0
+
+    @property
+    def shared(self):
+        """Whether invalidations reach every process, not just this one"""
+        return isinstance(self.backend, RedisBackend)
+
+    def invalidate(self, *tags):
+        if self.enabled and tags:
+            self.backend.bump(tags)
+
+    def clear(self):
+        self.invalidate(GLOBAL_TAG)
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "not_modified": self.not_modified}
+
+    def cached(self, make_response, tags):
+        """Decorator for a Flask-RESTful GET handler
+
+        make_response turns the handler's (data, code) into a Response, so the
+        body is encoded exactly as it would be uncached. tags(kwargs) names
+        what the response is built from. Only 200 responses are stored.
+        """
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return view(*args, **kwargs)
+
+                key = self._key()
+                entry = self._lookup(key)
+                if entry is not None:
+                    self._count('hits')
+                    etag, body = entry
+                else:
+                    self._count('misses')
+                    # Read generations before building, so a write landing meanwhile still invalidates the entry
+                    entry_tags = (GLOBAL_TAG,) + tuple(tags(kwargs))
+                    generations = dict(zip(entry_tags, self.backend.generations(entry_tags)))
+                    result = view(*args, **kwargs)
+                    data, code = _unpack(result)
+                    if code != 200:
+                        return result
+                    body = make_response(data, code).get_data()
+                    etag = hashlib.sha256(body).hexdigest()[:32]
+                    self.backend.set(key, _pack(etag, generations, body), self.ttl)
+
+                if request.if_none_match.contains(etag):
+                    self._count('not_modified')
+                    response = Response(status=304)
+                else:
+                    response = Response(body, status=200, mimetype='application/json')
+                response.set_etag(etag)
+                response.headers['Cache-Control'] = 'no-cache'
+                return response
+            return wrapper
+        return decorator
+
+    def _key(self):
+        return request.path + '?' + urlencode(sorted(request.args.items(multi=True)))
+
+    def _lookup(self, key):
+        raw = self.backend.get(key)
+        if raw is None:
+            return None
+        etag, generations, body = _unpack_entry(raw)
+        tags = list(generations)
+        if self.backend.generations(tags) != [generations[tag] for tag in tags]:
+            return None
+        return etag, body
+
+    def _count(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+
+def _unpack(result):
+    if isinstance(result, tuple):
+        return result[0], result[1] if len(result) > 1 else 200
+    return result, 200
+
+
+def _pack(etag, generations, body):
+    return json.dumps([etag, generations]).encode('utf-8') + b'\n' + body
+
+
+def _unpack_entry(raw):
+    meta, body = raw.split(b'\n', 1)
+    etag, generations = json.loads(meta)
+    return etag, generations, body
+
+
+def make_backend(url=None, max_entries=1024):
+    return RedisBackend(url) if url else MemoryBackend(max_entries)
@@ -0,0 +1,58 @@
+from sqlalchemy import func
+from config import db
+from models import Book
+from pagination import parse_limit, encode_cursor, decode_cursor
+
+# ts_headline options for result snippets
+HEADLINE_OPTIONS = 'StartSel=<mark>, StopSel=</mark>, MaxFragments=2, MaxWords=30, MinWords=10'
+
+
+def search_books(args):
+    """Ranked full-text search over the stored Book.search_vector
+
+    Reads q, limit, cursor and highlight from args. User input goes through
+    websearch_to_tsquery, so quotes, OR and -word work and stray punctuation
+    can't produce a syntax error.
+    """
+    query_text = (args.get('q') or '').strip()
+    limit = parse_limit(args.get('limit'))
+    offset = 0
+    if args.get('cursor'):
+        (offset,) = decode_cursor(args['cursor'], int)
+        if offset < 0:
+            raise ValueError("Invalid cursor.")
+    if not query_text:
+        return {"books": [], "next_cursor": None}
+
+    tsquery = func.websearch_to_tsquery('english', query_text)
+    rank = func.ts_rank_cd(Book.search_vector, tsquery).label('rank')
+    columns = [getattr(Book, column) for column in Book.api_fields.values()]
+    columns.append(rank)
+
+    highlight = args.get('highlight', '').lower() in ('1', 'true', 'yes')
+    if highlight:
+        document = func.coalesce(Book.content_preview, Book.description, '')
+        columns.append(func.ts_headline('english', document, tsquery, HEADLINE_OPTIONS).label('snippet'))
+
+    rows = (
+        db.session.query(*columns)
+        .filter(Book.search_vector.op('@@')(tsquery))
+        .order_by(rank.desc(), Book.id)
+        .offset(offset)
+        .limit(limit + 1)
+        .all()
+    )
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(offset + limit)
+
+    results = []
+    for row in rows:
+        result = Book.row_to_dict(row, Book.api_fields)
+        result['rank'] = row.rank
+        if highlight:
+            result['snippet'] = row.snippet
+        results.append(result)
+    return {"books": results, "next_cursor": next_cursor}
@@ -0,0 +1,115 @@
+from operator import attrgetter
+
+# Same format SerializerMixin uses, so compiled output matches the old to_dict()
+DATETIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+def compile_serializer(fields=(), datetimes=(), one=None, many=None):
+    """Build a function that turns a model instance into a plain dict
+
+    Unlike SerializerMixin, which re-reads serialize_only/serialize_rules and
+    walks the schema for every object it meets, the shape is fixed here once:
+    fields are copied as-is, datetimes are formatted like the mixin does, and
+    one/many map relationship names to the serializer for the related object
+    or objects.
+    """
+    one = tuple((one or {}).items())
+    many = tuple((many or {}).items())
+    fields = tuple(fields)
+    get_fields = attrgetter(*fields) if len(fields) > 1 else None
+
+    def serialize(obj):
+        if get_fields is not None:
+            data = dict(zip(fields, get_fields(obj)))
+        else:
+            data = {field: getattr(obj, field) for field in fields}
+        for name in datetimes:
+            value = getattr(obj, name)
+            data[name] = value.strftime(DATETIME_FORMAT) if value is not None else None
+        for name, serializer in one:
+            value = getattr(obj, name)
+            data[name] = serializer(value) if value is not None else None
+        for name, serializer in many:
+            data[name] = [serializer(value) for value in getattr(obj, name)]
+        return data
+
+    return serialize
+
+
+def _empty(obj):
+    return {}
+
+
+# Column sets per model, as listed in each model's serialize_only
+BOOK_FIELDS = ('id', 'title', 'author', 'genre', 'description', 'page_count', 'image_url', 'publication_year', 'pdf_url', 'is_pdf')
+READING_LIST_BOOK_FIELDS = ('id', 'reading_list_id', 'book_id', 'note', 'rating')
+REVIEW_FIELDS = ('id', 'user_id', 'book_id', 'review_text', 'rating')
+READING_LIST_FIELDS = ('id', 'name', 'user_id')
+USER_FIELDS = ('id', 'username')
+
+review_row = compile_serializer(REVIEW_FIELDS, datetimes=('created_at',))
+reading_list_book_row = compile_serializer(READING_LIST_BOOK_FIELDS)
+
+# A review's book carries its list memberships; a list entry's book carries its reviews
+review = compile_serializer(
+    REVIEW_FIELDS,
+    datetimes=('created_at',),
+    one={'book': compile_serializer(BOOK_FIELDS, many={'reading_list_books': reading_list_book_row})},
+)
+reading_list_book = compile_serializer(
+    READING_LIST_BOOK_FIELDS,
+    one={'book': compile_serializer(BOOK_FIELDS, many={'reviews': review_row})},
+)
+reading_list_with_books = compile_serializer(
+    READING_LIST_FIELDS,
+    datetimes=('created_at', 'updated_at'),
+    many={'books': reading_list_book},
+)
+# The mixin has always rendered the nested user of a list as an empty object
+reading_list_with_books_and_user = compile_serializer(
+    READING_LIST_FIELDS,
+    datetimes=('created_at', 'updated_at'),
+    one={'user': _empty},
+    many={'books': reading_list_book},
+)
+# Lighter reading list shapes for endpoints that don't need the full graph
+reading_list_summary = compile_serializer(READING_LIST_FIELDS, datetimes=('created_at', 'updated_at'))
+reading_list_with_books_no_reviews = compile_serializer(
+    READING_LIST_FIELDS,
+    datetimes=('created_at', 'updated_at'),
+    many={'books': compile_serializer(READING_LIST_BOOK_FIELDS, one={'book': compile_serializer(BOOK_FIELDS)})},
+)
+# Review feeds: a book's reviews name their author, a user's reviews carry the book
+book_review = compile_serializer(
+    REVIEW_FIELDS,
+    datetimes=('created_at',),
+    one={'user': compile_serializer(USER_FIELDS)},
+)
+user_review = compile_serializer(
+    REVIEW_FIELDS,
+    datetimes=('created_at',),
+    one={'book': compile_serializer(BOOK_FIELDS)},
+)
+user = compile_serializer(
+    USER_FIELDS,
+    many={'reviews': review, 'reading_lists': reading_list_with_books},
+)
+
+# (model name, to_dict rules) -> compiled serializer
+SERIALIZERS = {
+    ('User', ()): user,
+    ('Review', ()): review,
+    ('ReadingList', ('books',)): reading_list_with_books,
+    ('ReadingList', ('books', 'user')): reading_list_with_books_and_user,
+    ('ReadingListBook', ()): reading_list_book,
+}
+
+
+class CompiledSerializerMixin:
+    """Serve to_dict() from SERIALIZERS, falling back to SerializerMixin for other shapes"""
+
+    def to_dict(self, only=(), rules=(), **kwargs):
+        serializer = None if only or kwargs else SERIALIZERS.get((type(self).__name__, tuple(rules)))
+        if serializer is None:
+            return super().to_dict(only=only, rules=rules, **kwargs)
+        return serializer(self)
@@ -0,0 +1,240 @@
+import os
+import secrets
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from flask.json.tag import TaggedJSONSerializer
+from flask.sessions import SecureCookieSession, SessionInterface
+
+try:
+    import redis
+except ImportError:  # Optional: only needed for a redis:// SESSION_STORE_URL
+    redis = None
+
+
+class SqliteSessionStore:
+    """Sessions in a local SQLite file, shared by every worker on the machine"""
+
+    # How often (seconds) a write also sweeps out expired sessions
+    PURGE_INTERVAL = 60
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._last_purge = 0.0
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                "id TEXT PRIMARY KEY, user_id INTEGER, data TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_sessions_user_id ON sessions (user_id)")
+
+    def _connection(self):
+        # sqlite3 connections can't cross threads, so each thread keeps its own
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, sid):
+        row = self._connection().execute(
+            "SELECT data FROM sessions WHERE id = ? AND expires_at > ?", (sid, time.time())
+        ).fetchone()
+        return row[0] if row else None
+
+    def set(self, sid, data, user_id, ttl):
+        now = time.time()
+        conn = self._connection()
+        conn.execute(
+            "INSERT OR REPLACE INTO sessions (id, user_id, data, expires_at) VALUES (?, ?, ?, ?)",
+            (sid, user_id, data, now + ttl),
+        )
+        if now - self._last_purge > self.PURGE_INTERVAL:
+            self._last_purge = now
+            conn.execute("DELETE FROM sessions WHERE expires_at <= ?", (now,))
+
+    def delete(self, sid):
+        self._connection().execute("DELETE FROM sessions WHERE id = ?", (sid,))
+
+    def delete_user(self, user_id):
+        return self._connection().execute("DELETE FROM sessions WHERE user_id = ?", (user_id,)).rowcount
+
+
+class RedisSessionStore:
+    """Sessions in a Redis-compatible server, with a set of session ids per user for revocation"""
+
+    def __init__(self, url, prefix='book_app:session:'):
+        if redis is None:
+            raise RuntimeError("SESSION_STORE_URL points at Redis but the redis package is not installed")
+        self._client = redis.Redis.from_url(url)
+        self._prefix = prefix
+
+    def get(self, sid):
+        value = self._client.get(self._prefix + sid)
+        return value.decode('utf-8') if value is not None else None
+
+    def set(self, sid, data, user_id, ttl):
+        ttl = max(1, int(ttl))
+        pipe = self._client.pipeline()
+        pipe.set(self._prefix + sid, data, ex=ttl)
+        if user_id is not None:
+            # The per-user set may list ids that have since expired; delete_user copes with that
+            user_key = f"{self._prefix}user:{user_id}"
+            pipe.sadd(user_key, sid)
+            pipe.expire(user_key, ttl)
+        pipe.execute()
+
+    def delete(self, sid):
+        self._client.delete(self._prefix + sid)
+
+    def delete_user(self, user_id):
+        user_key = f"{self._prefix}user:{user_id}"
+        sids = [sid.decode('utf-8') for sid in self._client.smembers(user_key)]
+        removed = self._client.delete(*(self._prefix + sid for sid in sids)) if sids else 0
+        self._client.delete(user_key)
+        return removed
+
+
+def make_session_store(url=None):
+    """Session store for a SESSION_STORE_URL: sqlite:///path or redis://...; None keeps cookie sessions"""
+    if not url:
+        return None
+    if url.startswith('sqlite:///'):
+        return SqliteSessionStore(url[len('sqlite:///'):])
+    if url.startswith(('redis://', 'rediss://', 'unix://')):
+        return RedisSessionStore(url)
+    raise ValueError(f"Unsupported SESSION_STORE_URL: {url}")
+
+
+class ServerSession(SecureCookieSession):
+    """Session whose data lives in a session store; the cookie holds only its id"""
+
+    def __init__(self, initial=None, sid=None):
+        super().__init__(initial)
+        self.sid = sid
+        # Who the session belonged to when loaded, so a login or logout can rotate the id
+        self.loaded_user_id = (initial or {}).get('user_id')
+
+
+class ServerSessionInterface(SessionInterface):
+    """Flask session interface backed by a session store
+
+    The cookie carries a random session id and nothing else, so a session can
+    be ended from the server: logging out or calling store.delete_user()
+    takes effect on the next request, whatever the browser still holds. The
+    id is replaced whenever the logged-in user changes, so an id seen before
+    login is useless afterwards.
+    """
+
+    serializer = TaggedJSONSerializer()
+    session_class = ServerSession
+
+    def __init__(self, store):
+        self.store = store
+
+    def open_session(self, app, request):
+        sid = request.cookies.get(self.get_cookie_name(app))
+        if sid:
+            raw = self.store.get(sid)
+            if raw is not None:
+                try:
+                    return self.session_class(self.serializer.loads(raw), sid=sid)
+                except (ValueError, TypeError):
+                    pass
+        return self.session_class(sid=None)
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+        secure = self.get_cookie_secure(app)
+        samesite = self.get_cookie_samesite(app)
+        httponly = self.get_cookie_httponly(app)
+
+        if session.accessed:
+            response.vary.add('Cookie')
+
+        if not session:
+            if session.modified and session.sid:
+                self.store.delete(session.sid)
+                response.delete_cookie(name, domain=domain, path=path, secure=secure,
+                                       samesite=samesite, httponly=httponly)
+            return
+
+        if not self.should_set_cookie(app, session):
+            return
+
+        user_id = session.get('user_id')
+        if session.sid is None or user_id != session.loaded_user_id:
+            if session.sid is not None:
+                self.store.delete(session.sid)
+            session.sid = secrets.token_urlsafe(32)
+            session.loaded_user_id = user_id
+
+        ttl = app.permanent_session_lifetime.total_seconds()
+        self.store.set(session.sid, self.serializer.dumps(dict(session)), user_id, ttl)
+        response.set_cookie(
+            name,
+            session.sid,
+            expires=self.get_expiration_time(app, session),
+            httponly=httponly,
+            domain=domain,
+            path=path,
+            secure=secure,
+            samesite=samesite,
+        )
+
+
+class PrincipalCache:
+    """Authenticated users by id, held in this process for a short TTL
+
+    Lets /check-auth and the protected-route guard answer "who is this?" from
+    memory. Entries are dropped on logout and whenever the user row changes
+    here; other workers see such changes once their entry expires.
+    """
+
+    def __init__(self, ttl=60, max_entries=10000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._invalidations = 0
+        self._lock = threading.Lock()
+
+    def get(self, user_id, load):
+        """The principal for user_id, calling load(user_id) on a miss; None if there is no such user"""
+        if self.ttl <= 0:
+            return load(user_id)
+        now = time.monotonic()
+        with self._lock:
+            item = self._entries.get(user_id)
+            if item is not None and item[1] > now:
+                self._entries.move_to_end(user_id)
+                self.hits += 1
+                return item[0]
+            self.misses += 1
+            invalidations = self._invalidations
+
+        principal = load(user_id)
+        with self._lock:
+            # Don't keep what we loaded if the user changed while we were loading it
+            if principal is not None and invalidations == self._invalidations:
+                self._entries[user_id] = (principal, now + self.ttl)
+                self._entries.move_to_end(user_id)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return principal
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+            self._invalidations += 1
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._entries)}
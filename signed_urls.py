@@ -0,0 +1,62 @@
+import re
+import threading
+import time
+import cloudinary.utils
+
+# https://res.cloudinary.com/<cloud>/<resource_type>/<type>/v<version>/<public_id>
+CLOUDINARY_URL_RE = re.compile(
+    r'^https?://[^/]+/[^/]+/(?P<resource_type>[^/]+)/(?P<type>[^/]+)/(?:v\d+/)?(?P<public_id>[^?#]+)'
+)
+
+
+def parse_cloudinary_url(url):
+    """Split a Cloudinary delivery URL into (resource_type, type, public_id, format)
+
+    Raw assets keep their extension in the public_id; for images and videos
+    the extension is the delivery format. Returns None for URLs that aren't
+    Cloudinary delivery URLs.
+    """
+    match = CLOUDINARY_URL_RE.match(url)
+    if not match:
+        return None
+    resource_type = match.group('resource_type')
+    public_id = match.group('public_id')
+    fmt = None
+    if resource_type != 'raw' and '.' in public_id.rsplit('/', 1)[-1]:
+        public_id, fmt = public_id.rsplit('.', 1)
+    return resource_type, match.group('type'), public_id, fmt
+
+
+class SignedUrlCache:
+    """Short-lived signed download URLs, reused until shortly before they expire"""
+
+    def __init__(self, ttl=300, refresh_margin=60):
+        self.ttl = ttl
+        self.refresh_margin = min(refresh_margin, ttl // 2)
+        self._urls = {}
+        self._lock = threading.Lock()
+
+    def get(self, book_id, pdf_url):
+        """Return a signed URL for pdf_url, or None if it can't be signed"""
+        now = time.time()
+        with self._lock:
+            cached = self._urls.get(book_id)
+        if cached and cached[0] == pdf_url and cached[2] - self.refresh_margin > now:
+            return cached[1]
+
+        parsed = parse_cloudinary_url(pdf_url)
+        if parsed is None:
+            return None
+        resource_type, delivery_type, public_id, fmt = parsed
+        expires_at = int(now) + self.ttl
+        signed_url = cloudinary.utils.private_download_url(
+            public_id,
+            fmt,
+            resource_type=resource_type,
+            type=delivery_type,
+            expires_at=expires_at,
+        )
+        with self._lock:
+            self._urls[book_id] = (pdf_url, signed_url, expires_at)
+        return signed_url
+
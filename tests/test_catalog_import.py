@@ -0,0 +1,59 @@
+import io
+import json
+import os
+import pytest
+
+# The COPY path needs Postgres; point this at a scratch database, which the tests empty
+DATABASE_URL = os.getenv('TEST_DATABASE_URL')
+# Validation tests never connect, so without one any Postgres URL will do
+os.environ['SQLALCHEMY_DATABASE_URI'] = DATABASE_URL or 'postgresql://localhost/book_app_test'
+
+from config import app, db
+from models import Book
+from catalog_import import BookImporter, clean_record
+
+VALID = {'title': 'Dune', 'author': 'Frank Herbert', 'genre': 'Science Fiction', 'page_count': 412, 'publication_year': 1965}
+
+
+@pytest.fixture
+def database():
+    if not DATABASE_URL:
+        pytest.skip("set TEST_DATABASE_URL to a scratch Postgres database")
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        yield db
+        db.session.remove()
+        db.drop_all()
+
+
+def jsonl(*records):
+    return io.BytesIO(''.join(json.dumps(record) + '\n' for record in records).encode('utf-8'))
+
+
+def test_clean_record_accepts_a_complete_row():
+    row, errors = clean_record(VALID)
+    assert errors == []
+    assert row['title'] == 'Dune'
+
+
+@pytest.mark.parametrize('field', ['genre', 'page_count', 'publication_year'])
+def test_clean_record_rejects_what_the_book_validators_reject(field):
+    _, errors = clean_record({**VALID, field: None})
+    assert errors
+
+
+def test_clean_record_rejects_nul_characters():
+    _, errors = clean_record({**VALID, 'description': 'bad\x00byte'})
+    assert errors == ["Description cannot contain NUL characters."]
+
+
+def test_row_refused_by_the_database_falls_back_to_row_by_row(database):
+    errors = []
+    importer = BookImporter(batch_size=10, on_error=lambda line, row_errors: errors.append(line))
+    # Passes validation, but doesn't fit in an integer column, so the batch write fails
+    result = importer.run(jsonl(VALID, {**VALID, 'page_count': 2 ** 31}, {**VALID, 'title': 'Emma'}), 'jsonl')
+
+    assert result == {'imported': 2, 'failed': 1}
+    assert errors == [2]
+    assert sorted(title for (title,) in database.session.query(Book.title)) == ['Dune', 'Emma']
@@ -0,0 +1,134 @@
+import hashlib
+import os
+import tempfile
+from flask import Request, current_app, request
+from werkzeug.exceptions import RequestEntityTooLarge
+
+try:
+    import fcntl
+except ImportError:  # Windows dev machines: no cross-process locking
+    fcntl = None
+
+READ_SIZE = 64 * 1024
+
+
+class StagedFile:
+    """Disk-backed upload target that refuses to grow past max_bytes
+
+    Werkzeug's multipart parser writes file parts into this as the body
+    streams in, so an oversized upload is rejected as soon as it crosses the
+    limit and nothing beyond the parser's read buffer is ever held in memory.
+    The SHA-256 of the content is computed along the way.
+    """
+
+    def __init__(self, directory, max_bytes):
+        os.makedirs(directory, exist_ok=True)
+        fd, self.name = tempfile.mkstemp(dir=directory, suffix='.part')
+        self._file = os.fdopen(fd, 'w+b')
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.sha256 = hashlib.sha256()
+
+    def write(self, data):
+        self.size += len(data)
+        if self.max_bytes is not None and self.size > self.max_bytes:
+            raise RequestEntityTooLarge()
+        self.sha256.update(data)
+        return self._file.write(data)
+
+    def __getattr__(self, name):
+        return getattr(self._file, name)
+
+    def __iter__(self):
+        return iter(self._file)
+
+
+class UploadRequest(Request):
+    """Request class that stages file uploads straight into UPLOAD_STAGING_DIR"""
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        staged = StagedFile(current_app.config['UPLOAD_STAGING_DIR'], current_app.config['UPLOAD_MAX_BYTES'])
+        # Anything a view doesn't claim is removed at teardown
+        if not hasattr(self, 'staged_files'):
+            self.staged_files = []
+        self.staged_files.append(staged)
+        return staged
+
+
+def claim_staged_file(file_storage):
+    """Take ownership of an uploaded file's staged copy; returns (path, sha256 hex)"""
+    staged = file_storage.stream
+    staged.flush()
+    staged.close()
+    request.staged_files.remove(staged)
+    return staged.name, staged.sha256.hexdigest()
+
+
+def discard_staged_files(exc=None):
+    for staged in getattr(request, 'staged_files', []):
+        staged.close()
+        if os.path.exists(staged.name):
+            os.remove(staged.name)
+
+
+class ChunkOffsetError(Exception):
+    """A chunk was sent for an offset other than the end of the staged file"""
+    def __init__(self, received):
+        super().__init__(f"Expected offset {received}")
+        self.received = received
+
+
+class ChunkChecksumError(ValueError):
+    pass
+
+
+def chunked_part_dir():
+    directory = os.path.join(current_app.config['UPLOAD_STAGING_DIR'], 'chunked')
+    os.makedirs(directory, exist_ok=True)
+    return directory
+
+
+def chunked_part_path(upload_id):
+    return os.path.join(chunked_part_dir(), f"{upload_id}.part")
+
+
+def append_chunk(path, offset, stream, max_bytes, expected_sha256=None):
+    """Append the body in stream to the staged file at offset and return the new size
+
+    The chunk is copied in small reads while it is hashed, so memory use
+    doesn't depend on chunk size. A chunk that is too long or fails its
+    checksum is cut off again, leaving the file at offset for a retry.
+    """
+    with open(path, 'r+b') as part:
+        if fcntl is not None:
+            fcntl.flock(part, fcntl.LOCK_EX)
+        size = part.seek(0, os.SEEK_END)
+        if offset != size:
+            raise ChunkOffsetError(size)
+
+        digest = hashlib.sha256()
+        written = 0
+        try:
+            while True:
+                data = stream.read(READ_SIZE)
+                if not data:
+                    break
+                written += len(data)
+                if written > max_bytes:
+                    raise RequestEntityTooLarge()
+                digest.update(data)
+                part.write(data)
+            if expected_sha256 and digest.hexdigest() != expected_sha256.lower():
+                raise ChunkChecksumError("Chunk checksum does not match.")
+        except BaseException:
+            part.truncate(size)
+            raise
+        return size + written
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for data in iter(lambda: f.read(READ_SIZE), b''):
+            digest.update(data)
+    return digest.hexdigest()